@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Helper functions shared by the benchmark scripts.
+"""
+
+import time
+
+import numpy as np
+
+
+def timeit(fct, repeat=3):
+    """Returns the best runtime of ``fct`` out of ``repeat`` runs."""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fct()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def print_table(columns, rows):
+    """
+    Prints the results of a benchmark as a table, one row at a time.
+
+    :param columns: Header and format specification of each column, e.g. ``('time [s]', '.4f')``.
+    :type columns: list(tuple(str, str))
+
+    :param rows: Values of each row, in the order of the columns.
+    :type rows: iterable
+    """
+    widths = [max(len(header), 6) for header, _ in columns]
+    print(' '.join(
+        '{:>{}}'.format(header, width)
+        for (header, _), width in zip(columns, widths)
+    ))
+    for row in rows:
+        print(' '.join(
+            '{:>{}{}}'.format(value, width, fmt)
+            for value, (_, fmt), width in zip(row, columns, widths)
+        ))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark for reading the overlap matrices from a Wannier90 ``.mmn`` file. A synthetic file with two neighbours per k-point (only one of which is needed by Z2Pack) is written for a growing number of bands, and the runtime of :func:`z2pack.fp._read_mmn.get_m` is compared to the previous line-by-line parser.
+"""
+
+import os
+import re
+import tempfile
+
+import numpy as np
+
+from z2pack.fp._read_mmn import get_m
+
+from _helpers import timeit, print_table
+
+NUM_KPT = 20
+
+
+def write_mmn(path, num_bands, num_kpts, seed=0):
+    """Writes a synthetic ``.mmn`` file with random overlap matrices."""
+    rng = np.random.RandomState(seed)
+    with open(path, 'w') as f:
+        f.write(' Synthetic mmn file\n')
+        f.write('{:>12}{:>12}{:>12}\n'.format(num_bands, num_kpts, 2))
+        for i in range(1, num_kpts + 1):
+            for j in [i % num_kpts + 1, (i - 2) % num_kpts + 1]:
+                f.write('{:>5}{:>5}    0    0    0\n'.format(i, j))
+                values = rng.randn(num_bands * num_bands, 2)
+                f.write(''.join(
+                    '{:>18.12f}{:>18.12f}\n'.format(re, im)
+                    for re, im in values
+                ))
+
+
+def get_m_reference(mmn_file):
+    """
+    Reads the M-matrices from a ``.mmn`` file line by line, as was done before the NumPy-based parser.
+    """
+    with open(mmn_file, "r") as f:
+        f.readline()
+
+        re_int = re.compile(r'[\d]+')
+        num_bands, num_kpts, _ = (
+            int(i) for i in re.findall(re_int, f.readline())
+        )
+
+        lines = (line for line in f if line)
+        step = num_bands * num_bands + 1
+        blocks = zip(*[iter(lines)] * step)
+        M = []
+        re_float = re.compile(r'[0-9.\-E]+')
+        for block in blocks:
+            block = iter(block)
+            idx = [int(el) for el in re.findall(re_int, next(block))]
+            if idx[0] % num_kpts - idx[1] != -1:
+                continue
+
+            def to_complex(blockline):
+                k1, k2 = re.findall(re_float, blockline)
+                return float(k1) + 1j * float(k2)
+
+            M.append(
+                np.array([[to_complex(next(block)) for _ in range(num_bands)]
+                          for _ in range(num_bands)]).T
+            )
+    return M
+
+
+def run_cases(path):
+    """Yields the size and runtimes of both parsers for each number of bands."""
+    for num_bands in [25, 50, 100, 200]:
+        write_mmn(path, num_bands, NUM_KPT)
+        size = os.path.getsize(path) / 1e6
+        assert np.allclose(get_m(path), get_m_reference(path))
+        t_reference = timeit(lambda: get_m_reference(path))
+        t_numpy = timeit(lambda: get_m(path))
+        yield num_bands, size, t_reference, t_numpy, t_reference / t_numpy
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as folder:
+        print_table(
+            [('bands', 'd'), ('size [MB]', '.1f'), ('reference [s]', '.4f'),
+             ('numpy [s]', '.4f'), ('speedup', '.2f')],
+            run_cases(os.path.join(folder, 'wannier90.mmn'))
+        )
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark for the partial eigensolver in hm.System, which computes only the eigenpairs of the occupied bands. The runtime of ``get_eig`` is compared to diagonalizing the full Hamiltonians at the same k-points, for a growing number of orbitals.
+"""
+
+import numpy as np
+import scipy.linalg as la
+
+import z2pack
+
+from _helpers import timeit, print_table
+
+NUM_KPT = 21
+OCC_FRACTION = 0.1
+
+
+def random_hamilton(size, seed=0):
+    """Creates a random hermitian k-dependent Hamiltonian of the given size."""
+    rng = np.random.RandomState(seed)
+    h0, h1, h2 = (
+        rng.randn(size, size) + 1j * rng.randn(size, size) for _ in range(3)
+    )
+    h0 = h0 + h0.conjugate().T
+
+    def hamilton(k):
+        hop = np.exp(2j * np.pi * k[0]) * h1 + np.exp(2j * np.pi * k[1]) * h2
+        return h0 + hop + hop.conjugate().T
+
+    return hamilton
+
+
+def run_cases():
+    """Yields the runtimes of the full and partial eigensolver for each size."""
+    kpt = [np.array([0.1, t, 0.]) for t in np.linspace(0, 1, NUM_KPT)]
+    for size in [50, 100, 200, 400, 800]:
+        hamilton = random_hamilton(size)
+        num_occ = max(1, int(OCC_FRACTION * size))
+        system = z2pack.hm.System(hamilton, bands=num_occ, hermitian_tol=None)
+        t_full = timeit(lambda: [la.eigh(hamilton(k)) for k in kpt[:-1]])
+        t_partial = timeit(lambda: system.get_eig(kpt))
+        yield size, num_occ, t_full, t_partial, t_full / t_partial
+
+
+if __name__ == '__main__':
+    print_table(
+        [('orbitals', 'd'), ('bands', 'd'), ('full [s]', '.4f'),
+         ('partial [s]', '.4f'), ('speedup', '.2f')],
+        run_cases()
+    )
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark for creating a snapshot of a surface result, as is done in :func:`z2pack.surface.run` each time a line is added. A surface with a growing number of lines (each containing random eigenstates) is created, and the runtime of the snapshot, made by copying the :class:`.SurfaceData` which shares its lines, is compared to a :func:`copy.deepcopy` of the result.
+"""
+
+import copy
+
+import numpy as np
+
+from z2pack.line import LineResult, EigenstateLineData
+from z2pack.surface import SurfaceData, SurfaceResult
+
+from _helpers import timeit, print_table
+
+NUM_KPT = 20
+NUM_BANDS = 10
+SIZE = 40
+
+
+def create_data(num_lines, seed=0):
+    """Creates surface data with random eigenstates."""
+    rng = np.random.RandomState(seed)
+    data = SurfaceData()
+    for t in np.linspace(0, 1, num_lines):
+        eigenstates = [
+            list(rng.randn(NUM_BANDS, SIZE) + 1j * rng.randn(NUM_BANDS, SIZE))
+            for _ in range(NUM_KPT)
+        ]
+        data.add_line(t, LineResult(EigenstateLineData(eigenstates), [], []))
+    return data
+
+
+def run_cases():
+    """Yields the runtimes of the snapshot and the deepcopy for each number of lines."""
+    for num_lines in [10, 50, 100, 200]:
+        data = create_data(num_lines)
+        result = SurfaceResult(data, [], [])
+        snapshot_time = timeit(lambda: SurfaceResult(data.copy(), [], []))
+        deepcopy_time = timeit(lambda: copy.deepcopy(result), repeat=1)
+        yield num_lines, snapshot_time, deepcopy_time
+
+
+if __name__ == '__main__':
+    print_table(
+        [('lines', 'd'), ('snapshot [s]', '.2e'), ('deepcopy [s]', '.2e')],
+        run_cases()
+    )
@@ -8,8 +8,8 @@ except ImportError:
     from distutils.core import setup
 
 import sys
-if sys.version_info < (3, 4):
-    raise 'must use Python version 3.4 or higher'
+if sys.version_info < (3, 5):
+    raise 'must use Python version 3.5 or higher'
 
 readme = r"""Z2Pack is a tool that computes topological invariants and illustrates non-trivial features of Berry curvature. It works as a post-processing tool with all major first-principles codes (z2pack.fp), as well as with tight-binding models (z2pack.tb) and explicit Hamiltonian matrices -- such as the ones obtained from a k.p model (z2pack.hm).
 
@@ -48,7 +48,6 @@ setup(
         'Natural Language :: English',
         'Operating System :: Unix',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.4',
         'Programming Language :: Python :: 3.5',
         'Programming Language :: Python :: 3.6',
         'Intended Audience :: Science/Research',
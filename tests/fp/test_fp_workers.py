@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import numpy as np
+
+import z2pack
+
+def _kpt_fct(kpt):
+    return str(len(kpt))
+
+@pytest.fixture
+def mock_system(sample):
+    """
+    Creates a first-principles system whose command copies an existing .mmn file instead of running a calculation.
+    """
+    def inner(build_dir, num_workers):
+        mmn_file = os.path.join(sample('mmn'), 'bi.mmn')
+        return z2pack.fp.System(
+            input_files=[mmn_file],
+            file_names=['input.mmn'],
+            kpt_fct=_kpt_fct,
+            kpt_path='kpts',
+            command='sleep 0.1; cp input.mmn wannier90.mmn',
+            build_folder=build_dir,
+            num_workers=num_workers
+        )
+    return inner
+
+@pytest.fixture
+def kpt():
+    return [np.array([0, 0, t]) for t in np.linspace(0, 1, 10)]
+
+def test_invalid_num_workers(mock_system):
+    with tempfile.TemporaryDirectory() as build_dir:
+        with pytest.raises(ValueError):
+            mock_system(build_dir, num_workers=0)
+
+@pytest.mark.parametrize('num_workers', [1, 3])
+def test_threads(mock_system, kpt, num_workers):
+    with tempfile.TemporaryDirectory() as build_dir:
+        system = mock_system(build_dir, num_workers=num_workers)
+        reference = z2pack.fp._read_mmn.get_m(system._input_files[0])
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(system.get_mmn, [kpt] * 6))
+        for res in results:
+            assert np.allclose(res, reference)
+        if num_workers > 1:
+            assert sorted(os.listdir(build_dir)) == [
+                'worker-{}'.format(i) for i in range(num_workers)
+            ]
+
+def test_async(mock_system, kpt):
+    with tempfile.TemporaryDirectory() as build_dir:
+        system = mock_system(build_dir, num_workers=2)
+        reference = z2pack.fp._read_mmn.get_m(system._input_files[0])
+
+        async def run():
+            return await asyncio.gather(
+                *[system.get_mmn_async(kpt) for _ in range(5)]
+            )
+        loop = asyncio.new_event_loop()
+        try:
+            results = loop.run_until_complete(run())
+        finally:
+            loop.close()
+        for res in results:
+            assert np.allclose(res, reference)
+
+@pytest.mark.parametrize('num_workers', [1, 3])
+def test_pickle(mock_system, kpt, num_workers):
+    import pickle
+    with tempfile.TemporaryDirectory() as build_dir:
+        system = mock_system(build_dir, num_workers=num_workers)
+        system_copy = pickle.loads(pickle.dumps(system))
+        assert system_copy._free_folders.qsize() == num_workers
+        reference = z2pack.fp._read_mmn.get_m(system._input_files[0])
+        assert np.allclose(system_copy.get_mmn(kpt), reference)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import threading
+
+import pytest
+
+from z2pack._async_handler import AsyncHandler
+
+def test_last_object():
+    handled = []
+    with AsyncHandler(handled.append) as handler:
+        for i in range(100):
+            handler.send(i)
+    assert handled[-1] == 99
+    assert handled == sorted(set(handled))
+
+def test_no_handler():
+    with AsyncHandler(None) as handler:
+        handler.send(1)
+
+def test_fast_exit():
+    start = time.monotonic()
+    with AsyncHandler(lambda obj: None) as handler:
+        handler.send(1)
+    assert time.monotonic() - start < 0.1
+
+def test_min_interval():
+    handled = []
+    with AsyncHandler(handled.append, min_interval=10.) as handler:
+        handler.send(0)
+        # wait until the first object is handled
+        while not handled:
+            time.sleep(0.01)
+        for i in range(1, 10):
+            handler.send(i)
+    # the pending object is handled on exit, without waiting for the interval
+    assert handled == [0, 9]
+
+def test_coalesce():
+    handled = []
+    event = threading.Event()
+    def handler_fct(obj):
+        event.wait()
+        handled.append(obj)
+    with AsyncHandler(handler_fct) as handler:
+        for i in range(10):
+            handler.send(i)
+            time.sleep(0.01)
+        event.set()
+    assert len(handled) <= 2
+    assert handled[-1] == 9
+
+def test_error_on_exit():
+    def handler_fct(obj):
+        raise IOError(obj)
+    with pytest.raises(IOError):
+        with AsyncHandler(handler_fct) as handler:
+            handler.send(1)
+
+def test_error_on_send():
+    def handler_fct(obj):
+        raise IOError(obj)
+    with pytest.raises(IOError):
+        with AsyncHandler(handler_fct) as handler:
+            handler.send(1)
+            time.sleep(0.1)
+            handler.send(2)
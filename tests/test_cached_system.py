@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import numpy as np
+
+import z2pack
+
+@pytest.fixture
+def hm_system():
+    def hamilton(k):
+        kx, ky, kz = 2 * np.pi * np.array(k)
+        return np.array([
+            [np.cos(kz), np.sin(kx) - 1j * np.sin(ky)],
+            [np.sin(kx) + 1j * np.sin(ky), -np.cos(kz)]
+        ])
+    pos = [[0, 0, 0], [0.5, 0.25, 0]]
+    return z2pack.hm.System(hamilton, pos=pos), pos
+
+def test_hits(hm_system):
+    system, pos = hm_system
+    cached_system = z2pack.system.CachedEigenstateSystem(system, pos=pos)
+    kpt = [np.array([0.1, t, 0.2]) for t in np.linspace(0, 1, 11)]
+    cached_system.get_eig(kpt)
+    # the first and last k-point differ by an inverse lattice vector
+    assert cached_system.misses == 10
+    assert cached_system.hits == 1
+    cached_system.get_eig(kpt)
+    assert cached_system.misses == 10
+    assert cached_system.hits == 12
+
+@pytest.mark.parametrize('shift', [[0, 0, 0], [1, 0, 0], [-1, 2, 1]])
+def test_phase(hm_system, shift):
+    system, pos = hm_system
+    cached_system = z2pack.system.CachedEigenstateSystem(system, pos=pos)
+    kpt = [np.array([0.1, t, 0.2]) for t in np.linspace(0, 1, 11)]
+    cached_system.get_eig(kpt)
+    kpt_shifted = [k + shift for k in kpt]
+    res = cached_system.get_eig(kpt_shifted[:-1])
+    assert cached_system.misses == 10
+    for eig, expected in zip(res, system.get_eig(kpt_shifted[:-1])):
+        # the eigenstates are equal up to a phase
+        overlap = np.dot(np.conjugate(np.array(expected)), np.array(eig).T)
+        assert np.allclose(np.abs(overlap), 1)
+
+def test_line_result(hm_system):
+    system, pos = hm_system
+    cached_system = z2pack.system.CachedEigenstateSystem(system, pos=pos)
+    line = lambda t: [0.1, t, 0.2]
+    res = z2pack.line.run(system=system, line=line)
+    res_cached = z2pack.line.run(system=cached_system, line=line)
+    assert np.allclose(res.wcc, res_cached.wcc)
+
+def test_max_bytes(hm_system):
+    system, pos = hm_system
+    # one eigenstate with two complex components uses 32 bytes
+    cached_system = z2pack.system.CachedEigenstateSystem(
+        system, pos=pos, max_bytes=3 * 32
+    )
+    kpt = [np.array([0.1, t, 0.2]) for t in np.linspace(0, 1, 11)]
+    cached_system.get_eig(kpt)
+    assert cached_system.num_bytes == 3 * 32
+    cached_system.get_eig(kpt[-4:-1])
+    assert cached_system.misses == 10
+    cached_system.get_eig(kpt[:1])
+    assert cached_system.misses == 11
+    cached_system.clear()
+    assert cached_system.num_bytes == 0
+
+def test_threads(hm_system):
+    from concurrent.futures import ThreadPoolExecutor
+    system, pos = hm_system
+    # small enough that entries are evicted while other threads use them
+    cached_system = z2pack.system.CachedEigenstateSystem(
+        system, pos=pos, max_bytes=5 * 32
+    )
+    kpt_lists = [
+        [np.array([s, t, 0.2]) for t in np.linspace(0, 1, 11)]
+        for s in np.linspace(0, 0.5, 4)
+    ] * 10
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(cached_system.get_eig, kpt_lists))
+    for kpt, res in zip(kpt_lists, results):
+        for eig, expected in zip(res, system.get_eig(kpt)):
+            overlap = np.dot(np.conjugate(np.array(expected)), np.array(eig).T)
+            assert np.allclose(np.abs(overlap), 1)
+    assert cached_system.hits + cached_system.misses == 11 * len(kpt_lists)
+    assert cached_system.num_bytes <= 5 * 32
+
+def test_pos_required(hm_system):
+    system, _ = hm_system
+    with pytest.raises(TypeError):
+        z2pack.system.CachedEigenstateSystem(system)
+    with pytest.raises(ValueError):
+        z2pack.system.CachedEigenstateSystem(system, pos=None)
+
+def test_closed_line_gauge(hm_system):
+    """
+    Test that the start and end of a closed line are in the same gauge, also if they were computed in separate calls.
+    """
+    system, pos = hm_system
+    cached_system = z2pack.system.CachedEigenstateSystem(system, pos=pos)
+    kpt = [np.array([0.1, t, 0.2]) for t in np.linspace(0, 1, 11)]
+    # the end point is computed first, in a separate call
+    cached_system.get_eig(kpt[-1:])
+    res = cached_system.get_eig(kpt)
+    assert np.allclose(
+        res[-1],
+        res[0] * np.exp(-2j * np.pi * np.dot(pos, [0, 1, 0]))[None, :]
+    )
+    data = z2pack.line.EigenstateLineData(res)
+    data_reference = z2pack.line.EigenstateLineData(system.get_eig(kpt))
+    assert np.allclose(data.wcc, data_reference.wcc)
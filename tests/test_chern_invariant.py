@@ -47,3 +47,101 @@ def test_linear_2(M, L, x, offset, patch_surface_data):
     wcc = np.array(wcc).T
     data = SurfaceData(wcc)
     assert (abs(offset) / (L - 1) >= 0.5) or np.isclose(z2pack.invariant.chern(data), offset)
+
+def test_batch(patch_surface_data):
+    """Test that the batched Chern number is the same as for the single surfaces"""
+    np.random.seed(42)
+    surfaces = [SurfaceData([]), SurfaceData([[0.3]])]
+    for num_lines in range(2, 30):
+        wcc = np.cumsum(np.random.uniform(-0.4, 0.4, size=(num_lines, 3)), axis=0)
+        surfaces.append(SurfaceData(wcc))
+    res = z2pack.invariant.chern_batch(surfaces)
+    assert res.shape == (len(surfaces), )
+    assert np.array_equal(res, [z2pack.invariant.chern(s) for s in surfaces])
+    assert np.array_equal(
+        res,
+        z2pack.invariant.chern_batch([s.get_array('pol') for s in surfaces])
+    )
+
+def test_batch_empty():
+    assert z2pack.invariant.chern_batch([]).shape == (0, )
+
+def _chern_model(k):
+    """Two-band model with Chern number one, in the reduced coordinates"""
+    kx, ky = 2 * np.pi * k[0], 2 * np.pi * k[1]
+    mass = 1 + np.cos(kx) + np.cos(ky)
+    return np.array([
+        [mass, np.sin(kx) - 1j * np.sin(ky)],
+        [np.sin(kx) + 1j * np.sin(ky), -mass]
+    ])
+
+@pytest.mark.parametrize('surface', [
+    lambda s, t: [s, t, 0],
+    lambda s, t: [t, s, 0],
+    lambda s, t: [t, s + t, 0.3],
+])
+@pytest.mark.parametrize('hm_kwargs', [
+    dict(),
+    dict(convention=2, pos=[[0, 0, 0], [0.3, 0.1, 0]]),
+])
+def test_lattice(surface, hm_kwargs):
+    """Test that the lattice Chern number is the same as the one from the WCC"""
+    system = z2pack.hm.System(_chern_model, **hm_kwargs)
+    chern, berry_flux = z2pack.invariant.chern_lattice(
+        system=system, surface=surface, num_lines=15, num_steps=11
+    )
+    assert berry_flux.shape == (14, 10)
+    assert np.isclose(chern, np.sum(berry_flux) / (2 * np.pi))
+    assert np.isclose(chern, round(chern))
+    result = z2pack.surface.run(system=system, surface=surface)
+    assert np.isclose(chern, z2pack.invariant.chern(result))
+
+def test_lattice_sphere():
+    """Test the lattice Chern number on a sphere around a Weyl point"""
+    system = z2pack.hm.System(
+        lambda k: np.array([
+            [k[2], k[0] - 1j * k[1]],
+            [k[0] + 1j * k[1], -k[2]]
+        ])
+    )
+    surface = z2pack.shape.Sphere([0, 0, 0], 1.)
+    chern, _ = z2pack.invariant.chern_lattice(system=system, surface=surface)
+    result = z2pack.surface.run(system=system, surface=surface)
+    assert np.isclose(chern, z2pack.invariant.chern(result))
+
+def test_lattice_degenerate():
+    """Test the lattice Chern number for two degenerate copies of a band"""
+    system = z2pack.hm.System(
+        lambda k: np.kron(np.eye(2), _chern_model(k)), bands=2
+    )
+    chern, _ = z2pack.invariant.chern_lattice(
+        system=system, surface=lambda s, t: [s, t, 0]
+    )
+    assert np.isclose(chern, 2)
+
+def test_lattice_open_surface():
+    system = z2pack.hm.System(_chern_model)
+    with pytest.raises(ValueError):
+        z2pack.invariant.chern_lattice(
+            system=system, surface=lambda s, t: [s, t / 2, 0]
+        )
+
+@pytest.mark.parametrize('num_lines, num_steps', [(1, 10), (10, 1)])
+def test_lattice_invalid_grid(num_lines, num_steps):
+    system = z2pack.hm.System(_chern_model)
+    with pytest.raises(ValueError):
+        z2pack.invariant.chern_lattice(
+            system=system,
+            surface=lambda s, t: [s, t, 0],
+            num_lines=num_lines,
+            num_steps=num_steps
+        )
+
+def test_lattice_overlap_system():
+    class MockSystem(z2pack.system.OverlapSystem):
+        def get_mmn(self, kpt):
+            raise NotImplementedError
+    with pytest.raises(ValueError):
+        z2pack.invariant.chern_lattice(
+            system=MockSystem(), surface=lambda s, t: [s, t, 0]
+        )
@@ -51,3 +51,14 @@ def test_mixed_3(gap_tol, patch_surface_data):
     data = SurfaceData([[0, 0.8], [0, 0.2]])
     mc.update(data)
     assert mc.converged == [gap_tol * 0.8 < 0.2]
+
+def test_random(gap_tol, N, patch_surface_data):
+    rng = np.random.RandomState(42)
+    data = SurfaceData(list(rng.uniform(size=(N + 1, 4))))
+    mc = GapCheck(gap_tol=gap_tol)
+    mc.update(data)
+    assert mc.converged == [
+        all(abs(w2 - l1.gap_pos) > gap_tol * l1.gap_size for w2 in l2.wcc) and
+        all(abs(w1 - l2.gap_pos) > gap_tol * l2.gap_size for w1 in l1.wcc)
+        for l1, l2 in zip(data.lines, data.lines[1:])
+    ]
@@ -36,3 +36,220 @@ def test_invalid_pos():
             hamilton=lambda k: np.array([[0]]),
             pos=[[0., 0., 0.], [0.5, 0.5, 0.5]]
         )
+
+def test_non_hermitian_vectorized():
+    H = lambda k: np.array([[[0, 1], [2, 0]]] * len(k))
+    system = z2pack.hm.System(hamilton=H, vectorized=True)
+    with pytest.raises(ValueError):
+        z2pack.line.run(system=system, line=lambda t: [0, 0, t])
+
+@pytest.mark.parametrize('convention', [1, 2])
+def test_vectorized(convention):
+    def hamilton(k):
+        k = np.array(k)
+        kx, ky, kz = k[..., 0], k[..., 1], k[..., 2]
+        res = np.array([
+            [np.cos(2 * np.pi * kz), np.sin(2 * np.pi * kx) - 1j * np.sin(2 * np.pi * ky)],
+            [np.sin(2 * np.pi * kx) + 1j * np.sin(2 * np.pi * ky), -np.cos(2 * np.pi * kz)]
+        ])
+        return np.moveaxis(res, [0, 1], [-2, -1])
+
+    pos = [[0, 0, 0], [0.5, 0.5, 0]]
+    system = z2pack.hm.System(hamilton, pos=pos, convention=convention)
+    system_vectorized = z2pack.hm.System(
+        hamilton, pos=pos, convention=convention, vectorized=True
+    )
+    kpt = [np.array([0.1, t, 0.2]) for t in np.linspace(0, 1, 11)]
+    eigs = system.get_eig(kpt)
+    eigs_vectorized = system_vectorized.get_eig(kpt)
+    assert len(eigs) == len(eigs_vectorized)
+    for eig, eig_vectorized in zip(eigs, eigs_vectorized):
+        # eigenvectors are equal up to a phase
+        overlap = np.dot(np.conjugate(eig), np.array(eig_vectorized).T)
+        assert np.allclose(np.abs(overlap), np.eye(1))
+    res = z2pack.line.run(system=system, line=lambda t: kpt[0] + [0, t, 0])
+    res_vectorized = z2pack.line.run(
+        system=system_vectorized, line=lambda t: kpt[0] + [0, t, 0]
+    )
+    assert np.allclose(res.wcc, res_vectorized.wcc)
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_get_eig_lines(vectorized):
+    num_calls = [0]
+    def hamilton(k):
+        num_calls[0] += 1
+        k = np.array(k)
+        kx, ky, kz = k[..., 0], k[..., 1], k[..., 2]
+        res = np.array([
+            [np.cos(2 * np.pi * kz), np.sin(2 * np.pi * kx) - 1j * np.sin(2 * np.pi * ky)],
+            [np.sin(2 * np.pi * kx) + 1j * np.sin(2 * np.pi * ky), -np.cos(2 * np.pi * kz)]
+        ])
+        return np.moveaxis(res, [0, 1], [-2, -1])
+
+    system = z2pack.hm.System(
+        hamilton, pos=[[0, 0, 0], [0.5, 0.5, 0]], vectorized=vectorized
+    )
+    # closed and open lines
+    kpt_lines = [
+        [np.array([0.1 * i, t, 0.2]) for t in np.linspace(0, 1, 11)]
+        for i in range(4)
+    ] + [[np.array([0.3, t, 0.2]) for t in np.linspace(0.1, 0.5, 3)]]
+    num_calls[0] = 0
+    eig_lines = system.get_eig_lines(kpt_lines)
+    if vectorized:
+        assert num_calls[0] == 1
+    for kpt, eigs in zip(kpt_lines, eig_lines):
+        assert eigs.shape == (len(kpt), 1, 2)
+        assert eigs.flags['C_CONTIGUOUS']
+        assert np.allclose(eigs, system.get_eig(kpt))
+
+@pytest.mark.parametrize('vectorized, sparse_solver', [
+    (False, None), (True, None), (False, 'eigsh'), (False, 'lobpcg')
+])
+def test_num_threads(vectorized, sparse_solver):
+    import scipy.sparse as sp
+    size = 8
+    rng = np.random.RandomState(42)
+    mat = rng.randn(size, size) + 1j * rng.randn(size, size)
+    mat = mat + mat.conjugate().T
+    diag = np.diag(np.arange(size))
+    def hamilton(k):
+        k = np.array(k)
+        res = mat + np.cos(2 * np.pi * k[..., 2])[..., None, None] * diag
+        if sparse_solver is None:
+            return res
+        return sp.csr_matrix(res)
+    kwargs = dict(bands=3, vectorized=vectorized)
+    if sparse_solver is not None:
+        kwargs['sparse_solver'] = sparse_solver
+    kpt_lines = [
+        [np.array([0.1 * i, 0, t]) for t in np.linspace(0, 1, 11)]
+        for i in range(3)
+    ]
+    eig_serial = z2pack.hm.System(hamilton, **kwargs).get_eig_lines(kpt_lines)
+    eig_threads = z2pack.hm.System(
+        hamilton, num_threads=4, **kwargs
+    ).get_eig_lines(kpt_lines)
+    for eigs_serial, eigs_threads in zip(eig_serial, eig_threads):
+        if sparse_solver is None:
+            assert np.array_equal(eigs_serial, eigs_threads)
+        else:
+            # the iterative solvers have a random starting vector, so
+            # only the projectors onto the occupied subspace are compared
+            for eig1, eig2 in zip(eigs_serial, eigs_threads):
+                eig1, eig2 = np.array(eig1).T, np.array(eig2).T
+                assert np.allclose(
+                    np.dot(eig1, eig1.conjugate().T),
+                    np.dot(eig2, eig2.conjugate().T),
+                    atol=1e-6
+                )
+
+@pytest.mark.parametrize('num_threads', [0, -2])
+def test_invalid_num_threads(num_threads):
+    with pytest.raises(ValueError):
+        z2pack.hm.System(lambda k: np.eye(4), num_threads=num_threads)
+
+@pytest.mark.parametrize('bands, idx', [
+    (2, [0, 1]), ([1, 2], [1, 2]), ([-2, -1], [2, 3]), ([0, 2], [0, 2])
+])
+def test_band_subset(bands, idx):
+    rng = np.random.RandomState(42)
+    mat = rng.randn(4, 4) + 1j * rng.randn(4, 4)
+    H = lambda k: mat + mat.conjugate().T + np.diag(np.cos(2 * np.pi * k[2]) * np.arange(4))
+    system = z2pack.hm.System(H, bands=bands, convention=1)
+    kpt = [np.array([0, 0, t]) for t in np.linspace(0, 1, 5)]
+    for k, eig in zip(kpt, system.get_eig(kpt)):
+        _, eigvec = np.linalg.eigh(H(k))
+        expected = eigvec[:, idx]
+        # compare the projectors onto the occupied subspace
+        eig = np.array(eig).T
+        assert np.allclose(
+            np.dot(eig, eig.conjugate().T),
+            np.dot(expected, expected.conjugate().T)
+        )
+
+@pytest.mark.parametrize('bands, sparse_sigma, idx', [
+    (2, None, [0, 1]), ([2, 3], None, [2, 3]), ([3, 4], 0.1, None), (5, None, [0, 1, 2, 3, 4])
+])
+def test_sparse(bands, sparse_sigma, idx):
+    import scipy.sparse as sp
+    size = 6
+    rng = np.random.RandomState(42)
+    mat = rng.randn(size, size) + 1j * rng.randn(size, size)
+    H = lambda k: mat + mat.conjugate().T + np.diag(np.cos(2 * np.pi * k[2]) * np.arange(size))
+    system = z2pack.hm.System(
+        lambda k: sp.csr_matrix(H(k)),
+        bands=bands,
+        convention=1,
+        sparse_sigma=sparse_sigma
+    )
+    kpt = [np.array([0, 0, t]) for t in np.linspace(0, 1, 5)]
+    for k, eig in zip(kpt, system.get_eig(kpt)):
+        eigval, eigvec = np.linalg.eigh(H(k))
+        if idx is None:
+            expected = eigvec[:, np.sort(np.argsort(np.abs(eigval - sparse_sigma))[:2])]
+        else:
+            expected = eigvec[:, idx]
+        eig = np.array(eig).T
+        assert np.allclose(
+            np.dot(eig, eig.conjugate().T),
+            np.dot(expected, expected.conjugate().T)
+        )
+
+def test_sparse_invalid_bands():
+    import scipy.sparse as sp
+    system = z2pack.hm.System(
+        lambda k: sp.identity(4, format='csr'), bands=[0, 2]
+    )
+    with pytest.raises(ValueError):
+        system.get_eig([np.array([0, 0, t]) for t in np.linspace(0, 1, 3)])
+
+@pytest.mark.parametrize('converge', [True, False])
+def test_sparse_lobpcg(converge, monkeypatch):
+    import scipy.sparse as sp
+    lobpcg = z2pack.hm.sla.lobpcg
+    num_fallback = [0]
+    def lobpcg_mock(*args, **kwargs):
+        if not converge:
+            kwargs['maxiter'] = 1
+        return lobpcg(*args, **kwargs)
+    def eigh_subset_mock(*args, **kwargs):
+        num_fallback[0] += 1
+        return eigh_subset(*args, **kwargs)
+    eigh_subset = z2pack.hm._eigh_subset
+    monkeypatch.setattr(z2pack.hm.sla, 'lobpcg', lobpcg_mock)
+    monkeypatch.setattr(z2pack.hm, '_eigh_subset', eigh_subset_mock)
+    size = 40
+    rng = np.random.RandomState(42)
+    mat = sp.random(size, size, density=0.1, random_state=rng)
+    mat = mat + mat.T + sp.diags(np.arange(size, dtype=float))
+    H = lambda k: mat + np.cos(2 * np.pi * k[2]) * sp.diags(np.linspace(0, 1, size))
+    system = z2pack.hm.System(
+        lambda k: sp.csr_matrix(H(k), dtype=complex),
+        bands=3,
+        convention=1,
+        sparse_solver='lobpcg'
+    )
+    kpt = [np.array([0, 0, t]) for t in np.linspace(0, 1, 11)]
+    for k, eig in zip(kpt, system.get_eig(kpt)):
+        _, eigvec = np.linalg.eigh(H(k).toarray())
+        expected = eigvec[:, :3]
+        eig = np.array(eig).T
+        assert np.allclose(
+            np.dot(eig, eig.conjugate().T),
+            np.dot(expected, expected.conjugate().T),
+            atol=1e-5
+        )
+    # the dense solver is used only if LOBPCG does not converge
+    if converge:
+        assert num_fallback[0] == 0
+    else:
+        assert num_fallback[0] == len(kpt) - 2
+
+def test_invalid_sparse_solver():
+    with pytest.raises(ValueError):
+        z2pack.hm.System(lambda k: np.eye(4), sparse_solver='invalid')
+    with pytest.raises(ValueError):
+        z2pack.hm.System(
+            lambda k: np.eye(4), sparse_solver='lobpcg', sparse_sigma=0.
+        )
@@ -3,6 +3,7 @@
 
 import os
 import json
+import pickle
 import tempfile
 
 import pytest
@@ -256,3 +257,284 @@ def test_invalid_path(simple_system, simple_line):
             line=simple_line,
             save_file='invalid/path/file.json'
         )
+
+
+def test_nested_steps():
+    """Test the nested refinement of the number of k-points."""
+    assert z2pack.line.nested_steps(start=8, stop=65) == [8, 15, 29, 57]
+    with pytest.raises(ValueError):
+        z2pack.line.nested_steps(start=1)
+
+
+def test_eigenstate_reuse(weyl_line):
+    """
+    Test that eigenstates are computed only once per k-point when the number of steps is refined.
+    """
+    class CountingSystem(z2pack.hm.System):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.num_kpt = 0
+
+        def get_eig(self, kpt):
+            self.num_kpt += len(kpt)
+            return super().get_eig(kpt)
+
+    def hamilton(k):
+        kx, ky, kz = k
+        return np.array([[kz, kx - 1j * ky], [kx + 1j * ky, -kz]])
+
+    system = CountingSystem(hamilton)
+    iterator = z2pack.line.nested_steps(start=8, stop=57)
+    result = z2pack.line.run(
+        system=system, line=weyl_line, pos_tol=None, iterator=iterator
+    )
+    assert result.ctrl_states['StepCounter'] == 8
+    result = z2pack.line.run(
+        system=system, line=weyl_line, pos_tol=1e-12, iterator=iterator
+    )
+    # the line can converge before the last step, e.g. for kz=0
+    num_steps = result.ctrl_states['StepCounter']
+    assert system.num_kpt == 8 + num_steps
+    result_reference = z2pack.line.run(
+        system=z2pack.hm.System(hamilton),
+        line=weyl_line,
+        pos_tol=None,
+        iterator=[num_steps]
+    )
+    assert np.allclose(result.wcc, result_reference.wcc)
+
+
+class _ClosedLineSystem(z2pack.system.EigenstateSystem):
+    """
+    System which checks that it is always called with a closed line, because it does not set ``supports_partial_lines``.
+    """
+    def __init__(self):
+        self.calls = []
+        self._system = z2pack.hm.System(
+            lambda k: np.array([
+                [k[2], k[0] - 1j * k[1]],
+                [k[0] + 1j * k[1], -k[2]]
+            ])
+        )
+
+    def get_eig(self, kpt):
+        delta = np.array(kpt[-1]) - np.array(kpt[0])
+        assert len(kpt) > 1 and np.allclose(np.round(delta), delta)
+        self.calls.append(len(kpt))
+        return self._system.get_eig(kpt)
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_closed_line_contract(weyl_line, cached):
+    """
+    Test that systems which do not support partial lines are always called with the complete line.
+    """
+    system = _ClosedLineSystem()
+    assert not system.supports_partial_lines
+    iterator = z2pack.line.nested_steps(start=8, stop=57)
+    run_system = system
+    if cached:
+        run_system = z2pack.system.CachedEigenstateSystem(
+            system, pos=[[0, 0, 0], [0, 0, 0]]
+        )
+        assert not run_system.supports_partial_lines
+    result = z2pack.line.run(
+        system=run_system, line=weyl_line, pos_tol=None, iterator=iterator
+    )
+    assert system.calls == [8]
+    result = z2pack.line.run(
+        system=run_system, line=weyl_line, pos_tol=1e-12, iterator=iterator
+    )
+    num_steps = result.ctrl_states['StepCounter']
+    assert system.calls[-1] == num_steps
+    result_reference = z2pack.line.run(
+        system=system._system, line=weyl_line, iterator=[num_steps]
+    )
+    assert np.allclose(result.wcc, result_reference.wcc)
+
+
+def test_closed_line_contract_surface(weyl_surface):
+    """
+    Test that the batched line calculations in a surface also call the system with complete lines only.
+    """
+    system = _ClosedLineSystem()
+    result = z2pack.surface.run(system=system, surface=weyl_surface)
+    result_reference = z2pack.surface.run(
+        system=system._system, surface=weyl_surface
+    )
+    assert np.allclose(result.pol, result_reference.pol)
+
+
+@pytest.mark.parametrize('retention', ['boundary', 'memmap', 'streaming'])
+def test_eigenstate_retention(weyl_system, weyl_line, retention):
+    """
+    Test that the WCC and Wilson loop do not change when the eigenstates are not kept in memory.
+    """
+    result1 = z2pack.line.run(system=weyl_system, line=weyl_line)
+    result2 = z2pack.line.run(
+        system=weyl_system,
+        line=weyl_line,
+        eigenstate_retention=retention
+    )
+    assert_res_equal(result1, result2)
+    # no effect for systems which provide only overlap matrices
+    if not hasattr(result1, 'eigenstates'):
+        assert type(result2.data) is type(result1.data)
+        return
+    assert np.allclose(result1.wilson, result2.wilson)
+    assert np.allclose(result1.eigenstates[0], result2.eigenstates[0])
+    if retention in ['boundary', 'streaming']:
+        assert len(result2.eigenstates) == 2
+    else:
+        assert isinstance(result2.eigenstates, np.memmap)
+
+
+def test_invalid_eigenstate_retention(simple_system, simple_line):
+    """
+    Test that an invalid eigenstate retention policy raises an error.
+    """
+    with pytest.raises(ValueError):
+        z2pack.line.run(
+            system=simple_system,
+            line=simple_line,
+            eigenstate_retention='none'
+        )
+
+
+def test_retention_applied_per_line():
+    """
+    Test that in a batch of lines, the eigenstate retention policy is applied to a line as soon as it is finished, before the other lines are done.
+    """
+    from z2pack.line._run import _run_lines_impl
+    from z2pack.line._retention import _EigenstateRetention
+    from z2pack.line._control import StepCounter, PosCheck, ForceFirstUpdate
+
+    calls = []
+
+    class RecordingRetention(_EigenstateRetention):
+        def apply(self, result):
+            calls.append('apply')
+            return super().apply(result)
+
+    class RecordingSystem(z2pack.hm.System):
+        def get_eig_lines(self, kpt_lines):
+            calls.append('eig')
+            return super().get_eig_lines(kpt_lines)
+
+    system = RecordingSystem(
+        lambda k: np.array([
+            [k[2], k[0] - 1j * k[1]],
+            [k[0] + 1j * k[1], -k[2]]
+        ])
+    )
+    # the second line passes close to the Weyl point, and needs more steps
+    lines = [
+        lambda t, x=x: [x + np.cos(2 * np.pi * t), np.sin(2 * np.pi * t), 0.05]
+        for x in [0., 0.9]
+    ]
+    results = _run_lines_impl(
+        [[
+            StepCounter(iterator=range(8, 27, 2)),
+            PosCheck(pos_tol=1e-2),
+            ForceFirstUpdate()
+        ] for _ in lines],
+        system=system,
+        lines=lines,
+        retention=RecordingRetention('memmap', max_bytes=0)
+    )
+    assert calls.count('apply') == 2
+    assert calls.index('apply') < len(calls) - 1 - calls[::-1].index('eig')
+    assert len(results[0].eigenstates) < len(results[1].eigenstates)
+    for result in results:
+        assert isinstance(result.eigenstates, np.memmap)
+
+
+def test_from_overlaps_batch():
+    """
+    Test that the batched computation from overlap matrices gives the same result as computing each line separately.
+    """
+    overlaps = np.random.randn(5, 8, 3, 3) + 1j * np.random.randn(5, 8, 3, 3)
+    data_batch = z2pack.line.WccLineData.from_overlaps_batch(overlaps)
+    for line_overlaps, data in zip(overlaps, data_batch):
+        data_single = z2pack.line.WccLineData.from_overlaps(list(line_overlaps))
+        assert np.allclose(data_single.wcc, data.wcc)
+        assert np.isclose(data_single.pol, data.pol)
+        assert np.isclose(data_single.gap_pos, data.gap_pos)
+        assert np.isclose(data_single.gap_size, data.gap_size)
+
+
+def test_from_eigenstates_batch():
+    """
+    Test that the batched computation from eigenstates gives the same result as computing each line separately.
+    """
+    eigenstates = [[
+        np.random.randn(2, 4) + 1j * np.random.randn(2, 4) for _ in range(8)
+    ] for _ in range(5)]
+    data_batch = z2pack.line.EigenstateLineData.from_eigenstates_batch(
+        eigenstates
+    )
+    for line_eigenstates, data in zip(eigenstates, data_batch):
+        data_single = z2pack.line.EigenstateLineData(line_eigenstates)
+        assert np.array_equal(data.eigenstates, line_eigenstates)
+        assert np.allclose(data_single.wilson, data.wilson)
+        assert np.allclose(data_single.wcc, data.wcc)
+        assert np.allclose(
+            data_single.wilson_eigenstates, data.wilson_eigenstates
+        )
+        assert np.isclose(data_single.pol, data.pol)
+        assert np.isclose(data_single.gap_pos, data.gap_pos)
+        assert np.isclose(data_single.gap_size, data.gap_size)
+
+def test_from_eigenstates_batch_separate():
+    """
+    Test that the lines created in a batch do not share the array of eigenstates, and that it cannot be modified.
+    """
+    eigenstates = np.random.randn(5, 8, 2, 4) + 1j * np.random.randn(5, 8, 2, 4)
+    data_batch = z2pack.line.EigenstateLineData.from_eigenstates_batch(
+        eigenstates
+    )
+    for data in data_batch:
+        assert data.eigenstates.base is None
+        assert data.eigenstates.shape == (8, 2, 4)
+        assert not data.eigenstates.flags.writeable
+        assert not np.shares_memory(data.eigenstates, eigenstates)
+        with pytest.raises(ValueError):
+            data.eigenstates[0] = 0
+        for key in ['wilson', 'wilson_eigenstates']:
+            assert not getattr(data, key).flags.writeable
+    assert np.array_equal(
+        [data.eigenstates for data in data_batch], eigenstates
+    )
+
+def test_line_data_arrays():
+    """
+    Test that the line data stores the eigenstates and WCC as arrays, cannot be modified, and keeps the computed properties when pickled.
+    """
+    eigenstates = [
+        np.random.randn(2, 4) + 1j * np.random.randn(2, 4) for _ in range(8)
+    ]
+    data = z2pack.line.EigenstateLineData(eigenstates)
+    assert isinstance(data.eigenstates, np.ndarray)
+    assert data.eigenstates.shape == (8, 2, 4)
+    assert not hasattr(data, '__dict__')
+    with pytest.raises(AttributeError):
+        data.wcc = [0.1, 0.2]
+    with pytest.raises(AttributeError):
+        data.other = 1
+    wcc = data.wcc
+    assert isinstance(wcc, list)
+    assert data.wcc is wcc
+    assert not data.eigenstates.flags.writeable
+    assert not data._get_wcc().flags.writeable
+    # the given eigenstates are not changed
+    eigenstates_array = np.array(eigenstates)
+    z2pack.line.EigenstateLineData(eigenstates_array)
+    assert eigenstates_array.flags.writeable
+    data_copy = pickle.loads(pickle.dumps(data))
+    assert data_copy._get_computed('wcc') is not None
+    assert data_copy.wcc == wcc
+    assert np.array_equal(data_copy.wilson, data.wilson)
+    assert np.array_equal(data_copy.eigenstates, data.eigenstates)
+    data_wcc = z2pack.line.WccLineData(wcc)
+    assert data_wcc.wcc == wcc
+    assert data_wcc.gap_pos == data.gap_pos
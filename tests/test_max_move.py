@@ -53,3 +53,17 @@ def test_move_all(N):
         l2[idx] += move
         l2[idx] %= 1
     assert(max_move(l1, l2) <= abs(real_max_move) + epsilon)
+
+def test_batch(N):
+    wcc = [[random.random() for _ in range(N)] for _ in range(5)]
+    res = z2pack._utils._get_max_move_batch(wcc[:-1], wcc[1:])
+    assert list(res) == [
+        max_move(l1, l2) for l1, l2 in zip(wcc[:-1], wcc[1:])
+    ]
+
+def test_gapfind_batch(N):
+    wcc = [[random.random() for _ in range(N)] for _ in range(5)]
+    gap_pos, gap_size = z2pack._utils._gapfind_batch(wcc)
+    assert list(zip(gap_pos, gap_size)) == [
+        z2pack._utils._gapfind(line_wcc) for line_wcc in wcc
+    ]
@@ -24,3 +24,14 @@ def test_single_update(move_tol, patch_max_move, patch_surface_data):
     mc.update(SurfaceData([[v] for v in vals]))
     conv = [min(v1, v2) < move_tol for v1, v2 in zip(vals[:-1], vals[1:])]
     assert mc.converged == conv
+
+@pytest.mark.parametrize('num_wcc', [[4] * 6, [4, 4, 3, 4, 5, 4]])
+def test_random(move_tol, num_wcc, patch_surface_data):
+    rng = np.random.RandomState(42)
+    data = SurfaceData([rng.uniform(size=n) for n in num_wcc])
+    mc = MoveCheck(move_tol=move_tol)
+    mc.update(data)
+    assert mc.converged == [
+        z2pack._utils._get_max_move(l1.wcc, l2.wcc) < move_tol * min(l1.gap_size, l2.gap_size)
+        for l1, l2 in zip(data.lines[:-1], data.lines[1:])
+    ]
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import numpy as np
+
+from z2pack.surface._control import MoveCheck, GapCheck
+
+from monkeypatch_data import *
+
+@pytest.fixture(
+    params=[(MoveCheck, 'move_tol', tol) for tol in np.linspace(0.1, 0.5, 11)] +
+    [(GapCheck, 'gap_tol', tol) for tol in np.linspace(0.1, 0.49, 11)],
+    ids=lambda p: '{}-{:.3f}'.format(p[0].__name__, p[2])
+)
+def create_ctrl(request):
+    ctrl_class, tol_name, tol = request.param
+    return lambda: ctrl_class(**{tol_name: tol})
+
+def test_update_line(create_ctrl):
+    rng = np.random.RandomState(42)
+    data = SurfaceData()
+    ctrl = create_ctrl()
+    for t in rng.uniform(size=10):
+        wcc = rng.uniform(size=4)
+        index = data.add_line(t, LineResult(LineData(wcc), (), ()))
+        ctrl.update_line(data, index, inserted=True)
+        ctrl_full = create_ctrl()
+        ctrl_full.update(data)
+        assert ctrl.converged == ctrl_full.converged
+    for t in data.t[::3]:
+        wcc = rng.uniform(size=4)
+        index = data.update_line(t, LineResult(LineData(wcc), (), ()))
+        ctrl.update_line(data, index, inserted=False)
+        ctrl_full = create_ctrl()
+        ctrl_full.update(data)
+        assert ctrl.converged == ctrl_full.converged
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import os
+import copy
 import json
 import pickle
 import msgpack
@@ -102,6 +103,133 @@ def test_weyl_save(pos_tol, gap_tol, move_tol, num_lines, weyl_system, weyl_surf
     os.remove(fp.name)
     assert_res_equal(result1, result2)
 
+def test_weyl_save_npz(weyl_system, weyl_surface):
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'result.npz')
+        result1 = z2pack.surface.run(
+            system=weyl_system,
+            surface=weyl_surface,
+            save_file=path
+        )
+        result2 = z2pack.io.load(path)
+        assert_res_equal(result1, result2)
+        # the Wilson loops computed before saving are also restored
+        z2pack.io.save(result1, path)
+        result3 = z2pack.io.load(path, serializer=z2pack.io.npz)
+        assert_res_equal(result1, result3)
+
+def test_weyl_load_lazy(weyl_system, weyl_surface):
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'result.npz')
+        result1 = z2pack.surface.run(
+            system=weyl_system,
+            surface=weyl_surface,
+            save_file=path
+        )
+        result2 = z2pack.io.load(path, lazy=True)
+        assert result2.t == result1.t
+        assert result2.gap_pos == result1.gap_pos
+        assert result2.convergence_report == result1.convergence_report
+        # only the WCC are read
+        assert all('_data' not in vars(line.result) for line in result2.lines)
+        assert_res_equal(result1, result2)
+        assert_res_equal(result1, copy.deepcopy(result2))
+
+def test_load_lazy_invalid(simple_system, simple_surface):
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'result.json')
+        z2pack.surface.run(
+            system=simple_system,
+            surface=simple_surface,
+            save_file=path
+        )
+        with pytest.raises(ValueError):
+            z2pack.io.load(path, lazy=True)
+
+@pytest.mark.parametrize('retention', ['boundary', 'memmap', 'streaming'])
+def test_weyl_eigenstate_retention(weyl_system, weyl_surface, retention):
+    result1 = z2pack.surface.run(system=weyl_system, surface=weyl_surface)
+    result2 = z2pack.surface.run(
+        system=weyl_system,
+        surface=weyl_surface,
+        eigenstate_retention=retention,
+        eigenstate_max_bytes=1000
+    )
+    assert_res_equal(result1, result2)
+    with tempfile.TemporaryDirectory() as folder:
+        for ending in ['json', 'npz']:
+            path = os.path.join(folder, 'result.' + ending)
+            z2pack.io.save(result2, path)
+            assert_res_equal(result1, z2pack.io.load(path))
+
+def test_memmap_retention_releases(weyl_surface):
+    """
+    Test that the lines which are kept in memory by the memmap retention policy do not keep the eigenstates of other lines alive.
+    """
+    system = z2pack.hm.System(
+        lambda k: np.array([
+            [k[2], k[0] - 1j * k[1]],
+            [k[0] + 1j * k[1], -k[2]]
+        ])
+    )
+    result = z2pack.surface.run(
+        system=system,
+        surface=weyl_surface,
+        eigenstate_retention='memmap',
+        eigenstate_max_bytes=1000
+    )
+    eigenstates = [line.result.eigenstates for line in result.lines]
+    assert any(isinstance(eig, np.memmap) for eig in eigenstates)
+    assert not all(isinstance(eig, np.memmap) for eig in eigenstates)
+    for eig in eigenstates:
+        if isinstance(eig, np.memmap):
+            continue
+        # the array owning the memory contains only the eigenstates of
+        # this line
+        base = eig
+        while base.base is not None:
+            base = base.base
+        assert base.nbytes == eig.nbytes
+
+def test_weyl_save_journal(weyl_system, weyl_surface):
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'result.journal')
+        result1 = z2pack.surface.run(
+            system=weyl_system,
+            surface=weyl_surface,
+            save_file=path
+        )
+        result2 = z2pack.io.load(path)
+        assert_res_equal(result1, result2)
+        # restart from the journal, which re-runs all lines
+        result3 = z2pack.surface.run(
+            system=weyl_system,
+            surface=weyl_surface,
+            save_file=path,
+            load=True
+        )
+        assert_res_equal(result1, result3)
+        size = os.path.getsize(path)
+        assert_res_equal(result1, z2pack.io.compact_journal(path))
+        assert os.path.getsize(path) < size
+        assert_res_equal(result1, z2pack.io.load(path))
+
+def test_journal_truncated(simple_system, simple_surface):
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'result.journal')
+        result1 = z2pack.surface.run(
+            system=simple_system,
+            surface=simple_surface,
+            save_file=path
+        )
+        # simulate a write which was interrupted
+        with open(path, 'rb') as f:
+            content = f.read()
+        with open(path, 'wb') as f:
+            f.write(content[:-10])
+        result2 = z2pack.io.load(path)
+        assert result2.t == result1.t[:-1]
+
 def test_tb_save(pos_tol, gap_tol, move_tol, num_lines, tb_system, tb_surface):
     fp = tempfile.NamedTemporaryFile(delete=False)
     result1 = z2pack.surface.run(
@@ -139,6 +267,108 @@ def test_restart_2(weyl_system, weyl_surface):
     result2 = z2pack.surface.run(system=weyl_system, surface=weyl_surface, init_result=result2)
     assert_res_equal(result1, result2)
 
+# test that restarting does not change the initial result
+def test_restart_init_unchanged(weyl_system, weyl_surface):
+    result1 = z2pack.surface.run(system=weyl_system, surface=weyl_surface, pos_tol=0.5, gap_tol=1e-1, move_tol=0.5, num_lines=6)
+    lines = result1.lines
+    states = copy.deepcopy(result1.ctrl_states)
+    result2 = z2pack.surface.run(system=weyl_system, surface=weyl_surface, init_result=result1)
+    assert len(result2.lines) > len(lines)
+    assert result1.lines == lines
+    assert all(l1.result is l2.result for l1, l2 in zip(result1.lines, lines))
+    assert result1.ctrl_states == states
+
+def test_surface_data_copy():
+    data = z2pack.surface.SurfaceData()
+    line_res = z2pack.line.LineResult(z2pack.line.WccLineData([0.1]), [], [])
+    data.add_line(0.5, line_res)
+    data_copy = data.copy()
+    data.add_line(0.2, line_res)
+    data.update_line(0.5, line_res)
+    assert data.t == (0.2, 0.5)
+    assert data_copy.t == (0.5, )
+    with pytest.raises(AttributeError):
+        data.lines[0].result = line_res
+    with pytest.raises(ValueError):
+        data.update_line(0.3, line_res)
+
+def assert_arrays_equal(data1, data2):
+    for key in ['t', 'pol', 'gap_pos', 'gap_size']:
+        assert np.array_equal(data1.get_array(key), data2.get_array(key))
+    for array1, array2 in zip(data1.get_wcc_array(), data2.get_wcc_array()):
+        assert np.array_equal(array1, array2)
+    assert data1.wcc == data2.wcc
+    assert data1.gap_pos == data2.gap_pos
+
+def test_surface_data_arrays():
+    rng = np.random.RandomState(42)
+    def get_line_res():
+        wcc = rng.uniform(size=rng.randint(1, 5))
+        return z2pack.line.LineResult(z2pack.line.WccLineData(wcc), [], [])
+    data = z2pack.surface.SurfaceData()
+    assert len(data.get_array('pol')) == 0
+    data.get_wcc_array()
+    snapshots = []
+    for t in rng.uniform(size=10):
+        data.add_line(t, get_line_res())
+        snapshots.append((data.copy(), data.wcc))
+        assert_arrays_equal(data, z2pack.surface.SurfaceData(data.lines))
+    for t in data.t[::3]:
+        data.update_line(t, get_line_res())
+        assert_arrays_equal(data, z2pack.surface.SurfaceData(data.lines))
+    # copies are not changed by lines added later
+    for data_copy, wcc in snapshots:
+        assert data_copy.wcc == wcc
+        assert_arrays_equal(
+            data_copy, z2pack.surface.SurfaceData(data_copy.lines)
+        )
+    with pytest.raises(ValueError):
+        data.get_array('gap_pos')[0] = 0.
+    with pytest.raises(ValueError):
+        data.get_array('wcc')
+    # the arrays are not stored when pickling
+    assert_arrays_equal(data, pickle.loads(pickle.dumps(data)))
+    # the lists are cached until a line is added
+    assert data.wcc is data.wcc
+    pol = data.pol
+    assert data.pol is pol
+    data.add_line(0.5, get_line_res())
+    assert data.pol is not pol
+    assert len(data.pol) == len(pol) + 1
+
+def test_array_buffer():
+    from z2pack.surface._data import _ArrayBuffer
+    rng = np.random.RandomState(42)
+    reference = list(rng.uniform(size=3))
+    array = _ArrayBuffer(reference)
+    buffers = set()
+    for _ in range(200):
+        start = rng.randint(len(reference) + 1)
+        stop = min(start + rng.randint(2), len(reference))
+        values = list(rng.uniform(size=rng.randint(3)))
+        reference[start:stop] = values
+        array.replace(start, stop, values)
+        assert np.array_equal(array.values, reference)
+        buffers.add(id(array._buffer))
+    # the buffer is re-allocated only when its capacity is exceeded
+    assert len(buffers) < 10
+    array.shift(2, 1.)
+    assert np.array_equal(array.values[2:], np.array(reference[2:]) + 1)
+    with pytest.raises(ValueError):
+        array.values[0] = 0.
+
+def test_surface_data_neighbour_dist():
+    data = z2pack.surface.SurfaceData()
+    assert data.nearest_neighbour_dist(0.3) == 1
+    line_res = z2pack.line.LineResult(z2pack.line.WccLineData([0.1]), [], [])
+    t_values = [0.5, 0.2, 0.9, 0.]
+    for i, t in enumerate(t_values):
+        assert data.add_line(t, line_res) == sorted(t_values[:i + 1]).index(t)
+    for t in np.linspace(-0.2, 1.2, 29):
+        assert data.nearest_neighbour_dist(t) == min(
+            abs(t - t_line) for t_line in t_values
+        )
+
 def test_invalid_restart(simple_system, simple_surface):
     result = z2pack.surface.run(system=simple_system, surface=simple_surface)
     with pytest.raises(ValueError):
@@ -150,6 +380,24 @@ def test_file_restart(simple_system, simple_surface, serializer):
         result2 = z2pack.surface.run(system=simple_system, surface=simple_surface, save_file=fp.name, load=True, serializer=serializer)
     assert_res_equal(result, result2)
 
+def test_save_interval(simple_system, simple_surface):
+    with tempfile.NamedTemporaryFile() as fp:
+        result = z2pack.surface.run(system=simple_system, surface=simple_surface, save_file=fp.name, serializer=json, save_interval=100.)
+        result2 = z2pack.io.load(fp.name, serializer=json)
+    assert_res_equal(result, result2)
+
+def test_invalid_save_interval(simple_system, simple_surface):
+    with pytest.raises(ValueError):
+        z2pack.surface.run(system=simple_system, surface=simple_surface, save_interval=-1.)
+
+def test_save_error(simple_system, simple_surface, monkeypatch):
+    def save(*args, **kwargs):
+        raise IOError('Cannot save the result.')
+    monkeypatch.setattr(z2pack.io, 'save', save)
+    with tempfile.NamedTemporaryFile() as fp:
+        with pytest.raises(IOError):
+            z2pack.surface.run(system=simple_system, surface=simple_surface, save_file=fp.name, serializer=json)
+
 def test_load_inexisting(simple_system, simple_surface):
     with pytest.raises(IOError):
         result = z2pack.surface.run(system=simple_system, surface=simple_surface, save_file='invalid_name', load_quiet=False, load=True, serializer=json)
@@ -182,3 +430,30 @@ def test_invalid_save_path(simple_system, simple_surface):
         def surface(*args, **kwargs):
             raise TypeError
         z2pack.surface.run(system=simple_system, surface=surface, save_file='some/invalid/path/file.json')
+
+def test_thread_executor(weyl_system, weyl_surface):
+    from concurrent.futures import ThreadPoolExecutor
+    result1 = z2pack.surface.run(system=weyl_system, surface=weyl_surface)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        result2 = z2pack.surface.run(system=weyl_system, surface=weyl_surface, executor=executor)
+    assert_res_equal(result1, result2)
+
+def _weyl_hamilton(k):
+    kx, ky, kz = k
+    return np.array([[kz, kx - 1j * ky], [kx + 1j * ky, -kz]])
+
+def _weyl_surface(s, t):
+    return [
+        0.1 * np.cos(2 * np.pi * t) * np.sin(np.pi * s),
+        0.1 * np.sin(2 * np.pi * t) * np.sin(np.pi * s),
+        -0.1 * np.cos(np.pi * s)
+    ]
+
+def test_process_executor():
+    from concurrent.futures import ProcessPoolExecutor
+    system = z2pack.hm.System(_weyl_hamilton)
+    result1 = z2pack.surface.run(system=system, surface=_weyl_surface)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        result2 = z2pack.surface.run(system=system, surface=_weyl_surface, executor=executor)
+    assert result1.t == result2.t
+    assert np.allclose(result1.wcc, result2.wcc)
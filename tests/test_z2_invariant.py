@@ -41,3 +41,33 @@ def test_linear_2(M, L, patch_surface_data):
     wcc = np.array(wcc)
     data = SurfaceData(wcc)
     assert z2pack.invariant.z2(data) == 1
+
+def test_batch(patch_surface_data):
+    random.seed(42)
+    surfaces = [SurfaceData([]), SurfaceData([[0.3, 0.5]])]
+    for L in range(4, 20):
+        for x in np.linspace(0.05, 0.95, 5):
+            wcc = np.array([np.linspace(0, x, L), np.linspace(1, x, L)]).T
+            surfaces.append(SurfaceData(wcc))
+        surfaces.append(
+            SurfaceData([
+                sorted(random.random() for _ in range(random.randint(1, 6)))
+                for _ in range(L)
+            ])
+        )
+    res = z2pack.invariant.z2_batch(surfaces)
+    assert res.shape == (len(surfaces), )
+    assert np.array_equal(res, [z2pack.invariant.z2(s) for s in surfaces])
+    assert np.array_equal(
+        res,
+        z2pack.invariant.z2_batch([
+            (s.get_array('gap_pos'), *s.get_wcc_array()) for s in surfaces
+        ])
+    )
+
+def test_batch_empty():
+    assert z2pack.invariant.z2_batch([]).shape == (0, )
+
+def test_batch_invalid_offsets():
+    with pytest.raises(ValueError):
+        z2pack.invariant.z2_batch([([0.1, 0.2], [0.5, 0.6], [0, 1])])
@@ -2,49 +2,87 @@
 # -*- coding: utf-8 -*-
 
 import time
-from threading import Thread
-
-class Sentinel:
-    """Sentinel object to show that this is the last object to go into the queue. This triggers the termination of the asynchronous task."""
-    def __init__(self, obj):
-        self.obj = obj
+from threading import Thread, Condition
 
 class AsyncHandler:
-    """Context manager to handle asynchronous operations on some queue of 1 object. The asynchronous handler works on the latest object sent to it."""
-    def __init__(self, handler):
+    """Context manager to handle asynchronous operations on some queue of 1 object. The asynchronous handler works on the latest object sent to it: objects which are sent while the handler is busy replace each other, and only the latest one is handled.
+
+    :param handler: Function which is called with the objects sent to the handler. If it is ``None``, the objects are ignored.
+
+    :param min_interval: Minimum time (in seconds) between the start of two consecutive calls to the handler. When the context is exited, the latest object is handled immediately.
+    :type min_interval: float
+
+    An exception raised by the handler stops the handling of further objects. It is re-raised in the calling thread by the next call to :meth:`send`, or when the context is exited.
+    """
+    def __init__(self, handler, *, min_interval=0.):
         self.handler = handler
-        if self.handler is not None:
-            self._empty = object()
-            self.write_obj = self._empty
+        self.min_interval = min_interval
+        self._empty = object()
+        self._pending = self._empty
+        self._closed = False
+        self._error = None
+        self._condition = Condition()
+        self._thread = None
 
     def __enter__(self):
         if self.handler is not None:
-            def consume():
-                tmp1 = self._empty
+            self._thread = Thread(target=self._consume)
+            self._thread.start()
+        return self
+
+    def _consume(self):
+        """
+        Calls the handler on the pending objects, until the context is exited.
+        """
+        last_time = None
+        while True:
+            with self._condition:
                 while True:
-                    tmp2 = self.write_obj
-                    if tmp2 is tmp1:
-                        time.sleep(0.5)
-                        continue
-                    if isinstance(tmp2, Sentinel):
-                        if tmp2.obj is not tmp1:
-                            self.handler(tmp2.obj)
+                    if self._pending is not self._empty:
+                        if self._closed or last_time is None:
+                            break
+                        remaining = last_time + self.min_interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    elif self._closed:
                         return
-                    tmp1 = tmp2
-                    self.handler(tmp1)
-            # use concurrent.futures if you want to catch exceptions
-            # right now we don't catch them at all -- it might be preferable
-            # to catch them, but only if the can be caught exactly when
-            # they happen (i.e., not after the whole calculation has finished).
-            self.thread = Thread(target=consume)
-            self.thread.start()
-        return self
+                    else:
+                        self._condition.wait()
+                obj = self._pending
+                self._pending = self._empty
+            last_time = time.monotonic()
+            try:
+                self.handler(obj)
+            except Exception as exc:  # pylint: disable=broad-except
+                with self._condition:
+                    self._error = exc
+                return
 
     def send(self, obj):
+        """
+        Sends an object to the handler, replacing the previous object if it has not been handled yet.
+        """
         if self.handler is not None:
-            self.write_obj = obj
+            with self._condition:
+                self._raise_error()
+                self._pending = obj
+                self._condition.notify()
+
+    def _raise_error(self):
+        """
+        Re-raises the exception which occurred in the handler, if any.
+        """
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.handler is not None:
-            self.write_obj = Sentinel(self.write_obj)
-            self.thread.join()
+            with self._condition:
+                self._closed = True
+                self._condition.notify()
+            self._thread.join()
+            # an exception from the context takes precedence
+            if exc_type is None:
+                self._raise_error()
@@ -55,6 +55,15 @@ class DataControl(AbstractControl):
     def update(self, data):
         pass
 
+class IncrementalDataControl(DataControl):
+    """ABC for control objects which, in addition to being updated with the full data, can be updated after a single line of the data has changed."""
+    @abc.abstractmethod
+    def update_line(self, data, index, *, inserted):
+        """
+        Updates the control after the line at position ``index`` of ``data.lines`` was inserted (if ``inserted`` is True) or replaced. The control must have been up to date with the data before this change, otherwise it should fall back to a full update.
+        """
+        pass
+
 class IterationControl(AbstractControl):
     """ABC for iteration control objects. Enforces the existence of ..."""
     @abc.abstractmethod
@@ -1,24 +1,33 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import copy
+import numpy as np
 
-__all__ = ['_get_max_move', '_sgng', '_gapfind', '_dist']
+__all__ = [
+    '_get_max_move', '_get_max_move_batch', '_sgng', '_gapfind',
+    '_gapfind_batch', '_dist'
+]
 
 def _get_max_move(list_a, list_b):
     """
     new style convergence check!!
     """
-    full_list = copy.deepcopy(list_a)
-    full_list.extend(list_b)
-    gap = _gapfind(full_list)[0]
-    a_mod = sorted([(x + 1 - gap) % 1 for x in list_a])
-    b_mod = sorted([(x + 1 - gap) % 1 for x in list_b])
-    max_move = 0.
-    for a_pos, b_pos in zip(a_mod, b_mod):
-        max_move = max(_dist(a_pos, b_pos), max_move)
+    return float(_get_max_move_batch([list_a], [list_b])[0])
 
-    return max_move
+def _get_max_move_batch(wcc_a, wcc_b):
+    """
+    Computes the maximum move between the WCC of several pairs of lines at once. The WCC are given as arrays of shape ``(L, m)`` and ``(L, n)``, and an array of shape ``(L,)`` is returned.
+    """
+    wcc_a = np.array(wcc_a, dtype=float, ndmin=2)
+    wcc_b = np.array(wcc_b, dtype=float, ndmin=2)
+    gap = _gapfind_batch(np.concatenate([wcc_a, wcc_b], axis=-1))[0]
+    a_mod = np.sort((wcc_a + 1 - gap[:, np.newaxis]) % 1, axis=-1)
+    b_mod = np.sort((wcc_b + 1 - gap[:, np.newaxis]) % 1, axis=-1)
+    # surplus WCC of the longer list are ignored
+    num_wcc = min(a_mod.shape[-1], b_mod.shape[-1])
+    if num_wcc == 0:
+        return np.zeros(len(gap))
+    return np.max(_dist(a_mod[:, :num_wcc], b_mod[:, :num_wcc]), axis=-1)
 
 def _sgng(z, zplus, x):
     """
@@ -30,30 +39,32 @@ def _gapfind(wcc):
     """
     finds the largest gap in vector wcc, modulo 1
     """
-    wcc = sorted(wcc)
-    gapsize = 0
-    gappos = 0
-    N = len(wcc)
-    for i, (w1, w2) in enumerate(zip(wcc, wcc[1:])):
-        temp = w2 - w1
-        if temp > gapsize:
-            gapsize = temp
-            gappos = i
-    # this needs to be explicit, otherwise gapsize == 1 is not possible
-    temp = wcc[0] - wcc[-1] + 1
-    if temp > gapsize:
-        gapsize = temp
-        gappos = N - 1
-    return (wcc[gappos] + gapsize / 2) % 1, gapsize
+    gap_pos, gap_size = _gapfind_batch([wcc])
+    return float(gap_pos[0]), float(gap_size[0])
+
+def _gapfind_batch(wcc):
+    """
+    Finds the position and size of the largest gap, modulo 1, for the WCC of several lines given as an array of shape ``(L, m)``. If several gaps have the same size, the first one (in sorted order) is taken.
+    """
+    wcc = np.sort(np.array(wcc, dtype=float, ndmin=2), axis=-1)
+    # the gap across 1 needs to be explicit, otherwise gapsize == 1 is not
+    # possible
+    gaps = np.concatenate(
+        [np.diff(wcc, axis=-1), wcc[:, :1] - wcc[:, -1:] + 1], axis=-1
+    )
+    idx = np.argmax(gaps, axis=-1)[:, np.newaxis]
+    gap_size = np.take_along_axis(gaps, idx, axis=-1)[:, 0]
+    gap_pos = (np.take_along_axis(wcc, idx, axis=-1)[:, 0] + gap_size / 2) % 1
+    return gap_pos, gap_size
 
 def _dist(x, y):
     """
     Returns the smallest distance on the periodic [0, 1) between x, y
-    where x, y should be in [0, 1)
+    where x, y should be in [0, 1). Works elementwise on arrays.
     """
-    x = x % 1
-    y = y % 1
-    return min(abs(1 + x - y) % 1, abs(1 - x + y) % 1)
+    x = np.mod(x, 1)
+    y = np.mod(y, 1)
+    return np.minimum(np.abs(1 + x - y) % 1, np.abs(1 - x + y) % 1)
 
 def _pol_step(pol_list):
     offset = [-1, 0, 1]
@@ -62,3 +73,14 @@ def _pol_step(pol_list):
     for p1, p2 in zip(pol_list[:-1], pol_list[1:]):
         res.append(min((p2 - p1 + o for o in offset), key=abs))
     return res
+
+def _pol_step_batch(pol_list):
+    """
+    Computes the polarization steps between neighbouring entries of an array of polarizations. The result is the same as for :func:`_pol_step`, but returned as an array.
+    """
+    pol = np.remainder(np.array(pol_list, dtype=float), 1)
+    delta = pol[1:] - pol[:-1]
+    steps = np.stack([delta - 1, delta, delta + 1])
+    # np.argmin returns the first minimum, like the built-in min
+    idx = np.argmin(np.abs(steps), axis=0)[np.newaxis]
+    return np.take_along_axis(steps, idx, axis=0)[0]
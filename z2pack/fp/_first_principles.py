@@ -2,7 +2,9 @@
 # -*- coding: utf-8 -*-
 
 import os
+import queue
 import shutil
+import asyncio
 import subprocess
 import contextlib
 import collections.abc
@@ -43,7 +45,10 @@ class System(OverlapSystem):
     :param num_wcc:     Number of WCC which should be produced by the system. This parameter can be used to check the consistency of the calculation. By default, no such check is done.
     :type num_wcc:      int
 
-    .. note:: ``input_files`` and ``build_folder`` can be absolute or relative paths, the rest is relative to ``build_folder``
+    :param num_workers: Number of calculations which can run at the same time. If it is larger than one, each calculation is executed in a separate folder ``build_folder/worker-<i>``. Concurrent calculations can be started by calling :meth:`get_mmn` from multiple threads (e.g. with ``executor=ThreadPoolExecutor(num_workers)`` in :func:`.surface.run`), or with :meth:`get_mmn_async`.
+    :type num_workers:  int
+
+    .. note:: ``input_files`` and ``build_folder`` can be absolute or relative paths, the rest is relative to ``build_folder`` (or the worker folders, if ``num_workers`` is larger than one).
     """
     def __init__(
             self,
@@ -56,18 +61,20 @@ class System(OverlapSystem):
             build_folder='build',
             file_names=None,
             mmn_path='wannier90.mmn',
-            num_wcc=None
+            num_wcc=None,
+            num_workers=1
     ):
         # convert to lists (input_files)
         self._input_files = list(input_files)
         self._build_folder = os.path.abspath(build_folder)
 
         # copy to file_names and split off the name
+        # the paths are kept relative to the build folder, s.t. they can be
+        # used in each worker folder
         if file_names is None:
             self._file_names = [os.path.basename(filename) for filename in self._input_files]
         else:
             self._file_names = list(file_names)
-        self._file_names = self._to_abspath(self._file_names)
 
         # kpt_fct
         if isinstance(kpt_fct, collections.abc.Callable):
@@ -85,10 +92,13 @@ class System(OverlapSystem):
             self._kpt_path = [kpt_path]
         else:
             self._kpt_path = kpt_path
-        self._kpt_path = self._to_abspath(self._kpt_path)
 
         # check whether to append k-points or write separate file
-        self._k_mode = ['a' if path in self._file_names else 'w' for path in self._kpt_path]
+        file_names_abs = self._to_abspath(self._file_names, self._build_folder)
+        self._k_mode = [
+            'a' if path in file_names_abs else 'w'
+            for path in self._to_abspath(self._kpt_path, self._build_folder)
+        ]
 
         # check if the number of functions matches the number of paths
         if len(self._kpt_path) != len(self._kpt_fct):
@@ -97,45 +107,125 @@ class System(OverlapSystem):
                     len(self._kpt_path), len(self._kpt_fct)
                 )
             )
-        self._mmn_path = self._to_abspath(mmn_path)
+        self._mmn_path = mmn_path
         self._calling_path = os.getcwd()
 
         self._num_wcc = num_wcc
 
-    def _to_abspath(self, path):
+        # set up the pool of folders in which calculations can run
+        self._num_workers = int(num_workers)
+        if self._num_workers < 1:
+            raise ValueError('The number of workers must be at least 1, but is {}.'.format(self._num_workers))
+        if self._num_workers == 1:
+            self._worker_folders = [self._build_folder]
+        else:
+            self._worker_folders = [
+                os.path.join(self._build_folder, 'worker-{}'.format(i))
+                for i in range(self._num_workers)
+            ]
+        self._init_folder_pool()
+
+    def _init_folder_pool(self):
         """
-        Returns a list of absolute paths from a list of paths relative to the build folder, or a single absolute path from a single relative path.
+        Creates the queue of worker folders which are not currently in use.
+        """
+        self._free_folders = queue.Queue()
+        for folder in self._worker_folders:
+            self._free_folders.put(folder)
+
+    # the queue cannot be pickled, it is re-created instead
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_free_folders']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_folder_pool()
+
+    def _to_abspath(self, path, folder):
+        """
+        Returns a list of absolute paths from a list of paths relative to the given folder, or a single absolute path from a single relative path.
         """
         if isinstance(path, str):
-            return os.path.join(self._build_folder, path)
-        return [self._to_abspath(p) for p in path]
+            return os.path.join(folder, path)
+        return [self._to_abspath(p, folder) for p in path]
+
+    @contextlib.contextmanager
+    def _worker_folder(self):
+        """
+        Context manager which reserves one of the worker folders, waiting until one is free.
+        """
+        folder = self._free_folders.get()
+        try:
+            yield folder
+        finally:
+            self._free_folders.put(folder)
 
-    def _create_input(self, kpt):
+    def _create_input(self, kpt, folder):
         with contextlib.suppress(FileNotFoundError):
-            shutil.rmtree(self._build_folder)
-        os.mkdir(self._build_folder)
-        _copy(self._input_files, self._file_names)
+            shutil.rmtree(folder)
+        os.makedirs(folder)
+        _copy(self._input_files, self._to_abspath(self._file_names, folder))
 
-        for i, (k_mode, f_path) in enumerate(zip(self._k_mode, self._kpt_path)):
+        kpt_path = self._to_abspath(self._kpt_path, folder)
+        for i, (k_mode, f_path) in enumerate(zip(self._k_mode, kpt_path)):
             with open(f_path, k_mode) as f:
                 f.write(self._kpt_fct[i](kpt))
 
     def get_mmn(self, kpt):
-        N = len(kpt) - 1
+        with self._worker_folder() as folder:
+            # create input
+            self._create_input(kpt, folder)
 
-        # create input
-        self._create_input(kpt)
+            # execute command
+            subprocess.call(
+                self._command,
+                cwd=folder,
+                shell=True,
+                executable=self._executable
+            )
+
+            return self._read_mmn(folder, len(kpt) - 1)
 
-        # execute command
-        subprocess.call(
-            self._command,
-            cwd=self._build_folder,
-            shell=True,
-            executable=self._executable
-        )
+    async def get_mmn_async(self, kpt):
+        """
+        Coroutine version of :meth:`get_mmn`, which runs the first-principles calculation as an :mod:`asyncio` subprocess. At most ``num_workers`` calculations run at the same time, including those started with :meth:`get_mmn`.
+
+        :param kpt: The list of k-points for which the overlap matrices are to be computed.
+        :type kpt:  list
+        """
+        loop = asyncio.get_running_loop()
+        # the blocking steps are run in the default executor, to avoid
+        # stalling the event loop while waiting for a free folder
+        acquire = loop.run_in_executor(None, self._free_folders.get)
+        try:
+            folder = await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            # release the folder once it is acquired
+            acquire.add_done_callback(
+                lambda fut: self._free_folders.put(fut.result())
+            )
+            raise
+        try:
+            await loop.run_in_executor(None, self._create_input, kpt, folder)
+            process = await asyncio.create_subprocess_shell(
+                self._command,
+                cwd=folder,
+                executable=self._executable
+            )
+            await process.wait()
+            return await loop.run_in_executor(
+                None, self._read_mmn, folder, len(kpt) - 1
+            )
+        finally:
+            self._free_folders.put(folder)
 
-        # read mmn file
-        M = mmn.get_m(self._mmn_path)
+    def _read_mmn(self, folder, N):
+        """
+        Reads the overlap matrices from the ``.mmn`` file in the given folder, and checks that their number and shape is consistent.
+        """
+        M = mmn.get_m(self._to_abspath(self._mmn_path, folder))
         if len(M) == 0:
             raise ValueError('No overlap matrices were found. Maybe switch from shell_list to search_shells in wannier90.win or add more k-points to the line.')
         if len(M) != N:
@@ -1,7 +1,9 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import re
+import itertools
+import collections
+
 import numpy as np
 
 def get_m(mmn_file):
@@ -16,39 +18,28 @@ def get_m(mmn_file):
         with open(mmn_file, "r") as f:
             f.readline()
 
-            re_int = re.compile(r'[\d]+')
-
             # read the first line
-            num_bands, num_kpts, _ = (int(i) for i in re.findall(
-                re_int,
-                f.readline()
-            ))
-
-            # read the rest of the file
-            lines = (line for line in f if line)
-
-            step = num_bands * num_bands + 1
-            def grouper(iterable, n):
-                """Collect data into fixed-length chunks or blocks"""
-                args = [iter(iterable)] * n
-                return zip(*args)
-            blocks = grouper(lines, step)
+            num_bands, num_kpts, _ = (int(i) for i in f.readline().split())
+
+            block_size = num_bands * num_bands
             M = []
-            re_float = re.compile(r'[0-9.\-E]+')
-            for block in blocks:
-                block = iter(block)
-                idx = [int(el) for el in re.findall(re_int, next(block))]
+            for header in f:
+                if not header.strip():
+                    continue
+                idx = [int(el) for el in header.split()]
+                block = itertools.islice(f, block_size)
+                # only the overlaps between neighbouring k-points are needed,
+                # other blocks are skipped without parsing them
                 if idx[0] % num_kpts - idx[1] != -1:
+                    collections.deque(block, maxlen=0)
                     continue
 
-                def to_complex(blockline):
-                    k1, k2 = re.findall(re_float, blockline)
-                    return float(k1) + 1j * float(k2)
-
-                M.append(np.array([
-                    [to_complex(next(block)) for _ in range(num_bands)]
-                    for _ in range(num_bands)
-                ]).T)
+                values = np.array(''.join(block).split(), dtype=float)
+                M.append(
+                    (values[::2] + 1j * values[1::2]).reshape(
+                        num_bands, num_bands
+                    ).T
+                )
 
     except IOError as err:
         msg = str(err)
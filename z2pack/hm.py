@@ -4,12 +4,31 @@
 This module contains a class for creating Systems which are described by a Hamiltonian matrix (hm), such as k•p models.
 """
 
+import inspect
+import warnings
+import concurrent.futures
+
 import numpy as np
 import scipy.linalg as la
+import scipy.sparse as sp
+import scipy.sparse.linalg as sla
 from fsc.export import export
 
 from .system import EigenstateSystem
 
+# SciPy < 1.5 uses the 'eigvals' keyword instead of 'subset_by_index'
+if 'subset_by_index' in inspect.signature(la.eigh).parameters:
+    _SUBSET_KEYWORD = 'subset_by_index'
+else:
+    _SUBSET_KEYWORD = 'eigvals'
+
+
+def _eigh_subset(ham, subset):
+    """
+    Returns the eigenpairs of a hermitian matrix with the indices in the (inclusive) range ``subset``, in ascending order.
+    """
+    return la.eigh(ham, **{_SUBSET_KEYWORD: subset})
+
 
 @export
 class System(EigenstateSystem):
@@ -26,7 +45,7 @@ class System(EigenstateSystem):
         Per default, all orbitals are put at the origin.
     :type pos: list
 
-    :param bands: Specifies either the number of occupied bands (if it is an integer) or which bands should be taken into consideration (if it is a list of indices). If no value is given, half the given bands are considered.
+    :param bands: Specifies either the number of occupied bands (if it is an integer) or which bands should be taken into consideration (if it is a list of indices). If no value is given, half the given bands are considered. If the bands form a contiguous range of indices, only the corresponding eigenpairs are computed.
     :type bands: :py:class:`int` or :py:class:`list`
 
     :param hermitian_tol:   Maximum absolute value in the difference between the Hamiltonian and its hermitian conjugate. Use ``hermitian_tol=None`` to deactivate the test entirely.
@@ -34,7 +53,20 @@ class System(EigenstateSystem):
 
     :param convention: The convention used for the Hamiltonian, following the `pythtb formalism <http://www.physics.rutgers.edu/pythtb/_downloads/pythtb-formalism.pdf>`_. Convention 1 means that the eigenvalues of :math:`\mathcal{H}(\mathbf{k})` are wave vectors :math:`\left|\psi_{n\mathbf{k}}\right>`. With convention 2, they are the cell-periodic Bloch functions :math:`\left|u_{n\mathbf{k}}\right>`.
     :type convention: int
+
+    :param vectorized: If ``True``, the ``hamilton`` function is called with an array of shape ``(N, dim)`` containing all k-points of a line (or of all lines, in :meth:`get_eig_lines`), and must return an array of shape ``(N, size, size)`` with the corresponding Hamiltonians. The diagonalization is then done for all k-points at once, which is much faster for small models.
+    :type vectorized: bool
+
+    :param sparse_sigma: Energy around which the eigenstates are computed when the Hamiltonian is given as a :mod:`scipy.sparse` matrix. Such Hamiltonians are diagonalized with the iterative solver :func:`scipy.sparse.linalg.eigsh`, which requires the ``bands`` to form a contiguous range of indices. Per default, the lowest bands up to the highest selected one are computed. If ``sparse_sigma`` is given, shift-invert mode is used instead to compute the ``len(bands)`` eigenstates with energy closest to ``sparse_sigma``, regardless of their position in the spectrum.
+    :type sparse_sigma: float
+
+    :param sparse_solver: Iterative eigensolver used for sparse Hamiltonians. With ``'eigsh'``, each k-point is solved independently using :func:`scipy.sparse.linalg.eigsh`. With ``'lobpcg'``, :func:`scipy.sparse.linalg.lobpcg` is used, seeded with the eigenvectors of the previous k-point on the line. If it does not converge, a dense diagonalization is done instead. The ``'lobpcg'`` solver cannot be combined with ``sparse_sigma``.
+    :type sparse_solver: str
+
+    :param num_threads: Number of threads which are used to compute the eigenstates of different k-points concurrently. The threads are used for creating and diagonalizing the Hamiltonians at each k-point or, if ``vectorized=True``, for diagonalizing chunks of the Hamiltonians. With the ``'lobpcg'`` sparse solver, the k-points of a line are computed in the same thread, because each k-point is seeded with the result of the previous one. The resulting eigenstates are the same as for ``num_threads=1``.
+    :type num_threads: int
     """
+    supports_partial_lines = True
 
     def __init__(
         self,
@@ -44,9 +76,31 @@ class System(EigenstateSystem):
         pos=None,
         bands=None,
         hermitian_tol=1e-6,
-        convention=2
+        convention=2,
+        vectorized=False,
+        sparse_sigma=None,
+        sparse_solver='eigsh',
+        num_threads=1
     ):
         self._hamilton = hamilton
+        if int(num_threads) < 1:
+            raise ValueError(
+                "Invalid value '{}' for 'num_threads', must be a positive integer.".
+                format(num_threads)
+            )
+        self._num_threads = int(num_threads)
+        self._vectorized = vectorized
+        self._sparse_sigma = sparse_sigma
+        self._sparse_solver = sparse_solver
+        if self._sparse_solver not in {'eigsh', 'lobpcg'}:
+            raise ValueError(
+                "Invalid value '{}' for 'sparse_solver', must be either 'eigsh' or 'lobpcg'.".
+                format(self._sparse_solver)
+            )
+        if self._sparse_solver == 'lobpcg' and self._sparse_sigma is not None:
+            raise ValueError(
+                "The 'lobpcg' sparse solver cannot be used together with 'sparse_sigma'."
+            )
         self._hermitian_tol = hermitian_tol
         self._convention = int(convention)
         if self._convention not in {1, 2}:
@@ -55,7 +109,12 @@ class System(EigenstateSystem):
                 format(self._convention)
             )
 
-        size = len(self._hamilton([0] * dim))  # assuming to be square...
+        if self._vectorized:
+            size = np.shape(self._hamilton(np.zeros((1, dim))))[-1]
+        else:
+            # np.shape also works for sparse matrices, assuming to be square...
+            size = np.shape(self._hamilton([0] * dim))[-1]
+        self._size = size
         # add one atom for each orbital in the hamiltonian
         if pos is None:
             self._pos = [np.zeros(dim) for _ in range(size)]
@@ -72,23 +131,111 @@ class System(EigenstateSystem):
             self._bands = list(range(bands))
         else:
             self._bands = bands
+        # use a partial eigensolver if the bands form a contiguous range
+        band_idx = sorted(int(i) for i in np.arange(size)[self._bands])
+        if band_idx and band_idx == list(range(band_idx[0], band_idx[-1] + 1)):
+            self._band_range = (band_idx[0], band_idx[-1])
+        else:
+            self._band_range = None
 
     def get_eig(self, kpt):
         __doc__ = super().__doc__  # pylint: disable=redefined-builtin,no-member,unused-variable
-        # create k-points for string
-        k_points = kpt[:-1]
+        return self.get_eig_lines([kpt])[0]
+
+    def get_eig_lines(self, kpt_lines):
+        __doc__ = super().__doc__  # pylint: disable=redefined-builtin,no-member,unused-variable
+        # The last bloch state is the same as the first up to a phase factor
+        # if the k-points form a closed line.
+        kpt_lines = [[np.array(k) for k in kpt] for kpt in kpt_lines]
+        closed_list = []
+        k_points_list = []
+        for kpt in kpt_lines:
+            delta = kpt[-1] - kpt[0]
+            closed = len(kpt) > 1 and np.allclose(np.round(delta), delta)
+            closed_list.append(closed)
+            k_points_list.append(kpt[:-1] if closed else kpt)
+        k_points = [k for line_k_points in k_points_list for k in line_k_points]
 
         # get eigenvectors corr. to the chosen bands
-        eigs = []
-        for k in k_points:
-            ham = self._hamilton(k)
-            if self._hermitian_tol is not None:
-                diff = la.norm(ham - ham.conjugate().transpose(), ord=np.inf)
-                if diff > self._hermitian_tol:
-                    raise ValueError(
-                        'The Hamiltonian you used is not hermitian, with the maximum difference between the Hamiltonian and its adjoint being {0}. Use the ``hamilton_tol`` input parameter (in the ``tb.Hamilton`` constructor; currently {1}) to set the sensitivity of this test or turn it off completely (``hamilton_tol=None``).'.
-                        format(diff, self._hermitian_tol)
-                    )
+        if self._vectorized:
+            # the k-points of all lines are computed in a single call
+            eigs = self._get_eigvec_vectorized(k_points)
+        else:
+            eigs = np.array(self._get_eigvec_lines(k_points_list))
+
+        if self._convention == 2:
+            # normalize phases to get u instead of phi
+            eigs *= np.exp(
+                -2j * np.pi * np.dot(np.array(k_points), np.array(self._pos).T)
+            )[:, :, None]
+
+        res = []
+        offset = 0
+        for kpt, line_k_points, closed in zip(
+                kpt_lines, k_points_list, closed_list
+        ):
+            line_eigs = eigs[offset:offset + len(line_k_points)]
+            offset += len(line_k_points)
+            if closed:
+                last_eig = line_eigs[0] * np.exp(
+                    -2j * np.pi * np.dot(self._pos, kpt[-1] - kpt[0])
+                )[:, None]
+                line_eigs = np.concatenate([line_eigs, last_eig[np.newaxis]])
+            # the eigenstates of each k-point are given as rows
+            res.append(np.ascontiguousarray(np.swapaxes(line_eigs, -1, -2)))
+        return res
+
+    def _get_eigvec_lines(self, k_points_list):
+        """
+        Returns the eigenvectors of the chosen bands for all k-points in the given lines, as a flat list.
+        """
+        if self._sparse_solver == 'lobpcg':
+            # the k-points of a line must be computed in order, because the
+            # state is passed between them for warm-starting the solver
+            return [
+                eigvec for line_eigvecs in
+                self._map(self._get_eigvec_line, k_points_list)
+                for eigvec in line_eigvecs
+            ]
+        return self._map(
+            self._get_eigvec,
+            [k for line_k_points in k_points_list for k in line_k_points]
+        )
+
+    def _get_eigvec_line(self, k_points):
+        """
+        Returns the eigenvectors of the chosen bands for the k-points of a line, sharing the solver state between consecutive k-points.
+        """
+        solver_state = dict()
+        return [
+            self._get_eigvec(k, solver_state=solver_state) for k in k_points
+        ]
+
+    def _map(self, fct, iterable):
+        """
+        Applies the function to all elements of the iterable, using ``num_threads`` threads. Returns a list of the results, in the same order.
+        """
+        if self._num_threads == 1:
+            return list(map(fct, iterable))
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._num_threads
+        ) as executor:
+            return list(executor.map(fct, iterable))
+
+    def _get_eigvec(self, k, solver_state=None):
+        """
+        Returns the eigenvectors of the chosen bands at a single k-point, as columns of a 2D array. The ``solver_state`` dictionary is shared between consecutive k-points on a line.
+        """
+        ham = self._hamilton(k)
+        self._check_hermitian(ham)
+        if sp.issparse(ham):
+            if solver_state is None:
+                solver_state = dict()
+            eigvec = self._get_eigvec_sparse(ham, solver_state=solver_state)
+        elif self._band_range is not None:
+            # the eigenvalues are returned in ascending order
+            _, eigvec = _eigh_subset(ham, self._band_range)
+        else:
             eigval, eigvec = la.eigh(ham)
             eigval = np.real(eigval)
             idx = eigval.argsort()
@@ -98,22 +245,102 @@ class System(EigenstateSystem):
             # take only the lower - energy eigenstates
             eigvec = eigvec[:, idx]
 
-            # cast to complex explicitly to avoid casting error when the phase
-            # is complex but the eigenvector itself is not.
-            eigs.append(np.array(eigvec, dtype=complex))
+        # cast to complex explicitly to avoid casting error when the phase
+        # is complex but the eigenvector itself is not.
+        return np.array(eigvec, dtype=complex)
+
+    def _get_eigvec_sparse(self, ham, solver_state):
+        """
+        Returns the eigenvectors of the chosen bands for a sparse Hamiltonian, using an iterative eigensolver. For the ``'lobpcg'`` solver, the eigenvectors of the previous k-point are taken from ``solver_state`` as initial guess, and the current ones are stored there.
+        """
+        if self._band_range is None:
+            raise ValueError(
+                'Sparse Hamiltonians can only be used when the selected bands form a contiguous range of indices.'
+            )
+        start, stop = self._band_range
+        if self._sparse_sigma is None:
+            num_eig = stop + 1
+        else:
+            num_eig = stop - start + 1
+        # eigsh can only compute fewer than size - 1 eigenpairs
+        if num_eig >= self._size - 1:
+            eigval, eigvec = la.eigh(ham.toarray())
+            if self._sparse_sigma is None:
+                idx = np.arange(start, stop + 1)
+            else:
+                idx = np.sort(
+                    np.argsort(np.abs(eigval - self._sparse_sigma))[:num_eig]
+                )
+            return eigvec[:, idx]
+        if self._sparse_solver == 'lobpcg' and 'guess' in solver_state:
+            eigval, eigvec = self._lobpcg(ham, solver_state['guess'])
+        elif self._sparse_sigma is None:
+            eigval, eigvec = sla.eigsh(ham, k=num_eig, which='SA')
+        else:
+            eigval, eigvec = sla.eigsh(
+                ham, k=num_eig, sigma=self._sparse_sigma, which='LM'
+            )
+        if self._sparse_solver == 'lobpcg':
+            solver_state['guess'] = eigvec
+        idx = np.real(eigval).argsort()[-(stop - start + 1):]
+        return eigvec[:, idx]
+
+    @staticmethod
+    def _lobpcg(ham, guess):
+        """
+        Computes the lowest eigenpairs of a sparse Hamiltonian with LOBPCG, starting from the given guess for the eigenvectors. Falls back to a dense diagonalization if the iteration does not converge.
+        """
+        num_eig = guess.shape[1]
+        # non-convergence is detected from the residuals below
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            eigval, eigvec = sla.lobpcg(
+                ham, guess, largest=False, tol=1e-8, maxiter=200
+            )
+        residual = np.linalg.norm(ham.dot(eigvec) - eigvec * eigval, axis=0)
+        if np.all(residual < 1e-6 * np.maximum(1, np.abs(eigval))):
+            return eigval, eigvec
+        return _eigh_subset(ham.toarray(), (0, num_eig - 1))
 
-        for i, k in enumerate(kpt[:-1]):
-            if self._convention == 2:
-                # normalize phases to get u instead of phi
-                eigs[i] *= np.exp(-2j * np.pi * np.dot(self._pos, k))[:, None]
-            eigs[i] = list(eigs[i].T)
+    def _get_eigvec_vectorized(self, k_points):
+        """
+        Returns the eigenvectors of the chosen bands for all given k-points, as a 3D array of shape ``(N, size, len(bands))``. The Hamiltonians are created and diagonalized in a single call.
+        """
+        ham = np.asarray(self._hamilton(np.array(k_points)))
+        if ham.shape[0] != len(k_points):
+            raise ValueError(
+                'The vectorized Hamiltonian returned {0} matrices for {1} k-points.'.
+                format(ham.shape[0], len(k_points))
+            )
+        self._check_hermitian(ham)
+        # numpy.linalg.eigh returns the eigenvalues in ascending order. The
+        # stack of Hamiltonians is split into chunks for the threads.
+        chunks = np.array_split(ham, max(1, min(self._num_threads, len(ham))))
+        eigvec = np.concatenate([
+            eigvec for _, eigvec in self._map(np.linalg.eigh, chunks)
+        ])
+        idx = np.arange(ham.shape[-1])[self._bands]
+        idx.sort()
+        return np.array(eigvec[:, :, idx], dtype=complex)
 
-        # The last bloch state is the same as the first up to a phase factor
-        eigs.append(
-            list(
-                eigs[0] * np.exp(
-                    -2j * np.pi * np.dot(self._pos, kpt[-1] - kpt[0])
-                )[None, :]
+    def _check_hermitian(self, ham):
+        """
+        Checks that the given Hamiltonian, or stack of Hamiltonians, is hermitian up to ``hermitian_tol``.
+        """
+        if self._hermitian_tol is None:
+            return
+        if sp.issparse(ham):
+            diff = abs(ham - ham.conjugate().T).sum(axis=1).max()
+        else:
+            # maximum absolute row sum, i.e. the infinity norm of each matrix
+            diff = np.max(
+                np.sum(
+                    np.abs(ham - np.conjugate(np.swapaxes(ham, -1, -2))),
+                    axis=-1
+                )
+            )
+        if diff > self._hermitian_tol:
+            raise ValueError(
+                'The Hamiltonian you used is not hermitian, with the maximum difference between the Hamiltonian and its adjoint being {0}. Use the ``hamilton_tol`` input parameter (in the ``tb.Hamilton`` constructor; currently {1}) to set the sensitivity of this test or turn it off completely (``hamilton_tol=None``).'.
+                format(diff, self._hermitian_tol)
             )
-        )
-        return eigs
@@ -5,9 +5,12 @@
 This submodule contains functions for calculating the topological invariants from the result of a WCC / Wilson loop calculation.
 """
 
+import numpy as np
 from fsc.export import export
 
-from ._utils import _pol_step, _sgng
+from ._utils import _pol_step_batch
+from .surface import SurfaceData, SurfaceResult
+from .system import EigenstateSystem
 
 @export
 def chern(surface_result):
@@ -24,7 +27,7 @@ def chern(surface_result):
         result = z2pack.surface.run(...)
         print(z2pack.invariant.chern(result)) # Prints the Chern number
     """
-    return sum(_pol_step(surface_result.pol))
+    return float(chern_batch([surface_result])[0])
 
 @export
 def z2(surface_result):
@@ -41,10 +44,192 @@ def z2(surface_result):
         result = z2pack.surface.run(...)
         print(z2pack.invariant.z2(result)) # Prints the Z2 invariant
     """
-    wcc = surface_result.wcc
-    gap = surface_result.gap_pos
-    inv = 1
-    for g1, g2, w2 in zip(gap, gap[1:], wcc[1:]):
-        for w in w2:
-            inv *= _sgng(g1, g2, w)
-    return 1 if inv == -1 else 0
+    return int(z2_batch([surface_result])[0])
+
+@export
+def chern_batch(surface_results):
+    r"""
+    Computes the Chern numbers corresponding to several surface results, computing the polarization steps of all surfaces at once. The result is the same as calling :func:`chern` on each of them.
+
+    :param surface_results: Results of WCC calculations on surfaces. Instead of a surface result, the polarizations of its lines can be given as an array (see :meth:`.SurfaceData.get_array`).
+    :type surface_results: list
+
+    :returns: An array containing the Chern number of each surface.
+
+    Example code:
+
+    .. code :: python
+
+        results = [z2pack.io.load(filename) for filename in filenames]
+        print(z2pack.invariant.chern_batch(results)) # Prints the Chern numbers
+    """
+    pol_arrays = [
+        _get_surface_array(surface, 'pol') for surface in surface_results
+    ]
+    offsets = _get_offsets([len(pol) for pol in pol_arrays])
+    steps = _pol_step_batch(np.concatenate([[]] + pol_arrays))
+    # The steps between the last line of a surface and the first line of
+    # the next one are skipped. The sum is done with the built-in function,
+    # to get exactly the same result as in 'chern'.
+    res = [
+        sum(steps[start:max(start, stop - 1)].tolist())
+        for start, stop in zip(offsets[:-1], offsets[1:])
+    ]
+    return np.array(res, dtype=float)
+
+@export
+def z2_batch(surface_results):
+    r"""
+    Computes the :math:`\mathbb{Z}_2` invariants corresponding to several surface results, comparing the WCC of all surfaces to the gap positions at once. The result is the same as calling :func:`z2` on each of them.
+
+    :param surface_results: Results of WCC calculations on surfaces. Instead of a surface result, a tuple ``(gap_pos, wcc, offsets)`` of its arrays can be given, where ``gap_pos`` is the array of gap positions (see :meth:`.SurfaceData.get_array`) and ``(wcc, offsets)`` is the ragged WCC array (see :meth:`.SurfaceData.get_wcc_array`).
+    :type surface_results: list
+
+    :returns: An array containing the :math:`\mathbb{Z}_2` invariant of each surface.
+
+    Example code:
+
+    .. code :: python
+
+        results = [z2pack.io.load(filename) for filename in filenames]
+        print(z2pack.invariant.z2_batch(results)) # Prints the Z2 invariants
+    """
+    gap_arrays = []
+    wcc_arrays = []
+    wcc_counts = []
+    for surface in surface_results:
+        gap_pos, wcc, wcc_offsets = _get_z2_arrays(surface)
+        gap_arrays.append(gap_pos)
+        wcc_arrays.append(wcc)
+        wcc_counts.append(np.diff(wcc_offsets))
+    num_lines = np.array([len(gap_pos) for gap_pos in gap_arrays], dtype=int)
+    line_offsets = _get_offsets(num_lines)
+    gap_pos = np.concatenate([[]] + gap_arrays)
+    wcc = np.concatenate([[]] + wcc_arrays)
+    line_idx = np.repeat(
+        np.arange(len(gap_pos)),
+        np.concatenate([np.zeros(0, dtype=int)] + wcc_counts)
+    )
+
+    # the WCC of the first line of a surface are not compared to a gap
+    is_first = np.zeros(len(gap_pos), dtype=bool)
+    is_first[line_offsets[:-1][num_lines > 0]] = True
+    mask = ~is_first[line_idx]
+    line_idx = line_idx[mask]
+    wcc = wcc[mask]
+
+    gap_1 = gap_pos[line_idx - 1]
+    gap_2 = gap_pos[line_idx]
+    crossing = (np.maximum(gap_1, gap_2) > wcc) & (
+        np.minimum(gap_1, gap_2) < wcc
+    )
+    surface_idx = np.repeat(np.arange(len(num_lines)), num_lines)
+    num_crossings = np.bincount(
+        surface_idx[line_idx[crossing]], minlength=len(num_lines)
+    )
+    return num_crossings % 2
+
+@export
+def chern_lattice(*, system, surface, num_lines=21, num_steps=21):
+    r"""
+    Computes the Chern number on a fixed grid of k-points, using the lattice method of Fukui, Hatsugai and Suzuki [`J. Phys. Soc. Jpn. 74, 1674 (2005) <https://doi.org/10.1143/JPSJ.74.1674>`_]. The Berry flux through each plaquette of the grid is given by the phase of the product of the overlap determinants around it. Unlike :func:`.surface.run`, there is no convergence check, so this can be used as a fast pre-screening. The result has the same sign convention as :func:`chern`.
+
+    :param system:  System for which the Chern number is calculated.
+    :type system:   :class:`.EigenstateSystem`
+
+    :param surface: Function describing the surface on which the Chern number is calculated, in the same form as for :func:`.surface.run`. For each :math:`t_1`, the points :math:`t_2=0` and :math:`t_2=1` must differ only by an inverse lattice vector.
+    :type surface:  :py:func:`callable`
+
+    :param num_lines:   Number of lines, at equidistant positions :math:`t_1`.
+    :type num_lines:    int
+
+    :param num_steps:   Number of k-points on each line.
+    :type num_steps:    int
+
+    :returns: A tuple ``(chern, berry_flux)``, where ``berry_flux`` is an array of shape ``(num_lines - 1, num_steps - 1)`` containing the Berry flux through each plaquette, and ``chern`` is its sum divided by :math:`2 \pi`.
+
+    The eigenstates of all lines are computed with a single call to :meth:`.EigenstateSystem.get_eig_lines`.
+
+    Example code:
+
+    .. code :: python
+
+        chern, berry_flux = z2pack.invariant.chern_lattice(
+            system=..., # Refer to the various ways of defining a system.
+            surface=lambda t1, t2: [t1, t2, 0]
+        )
+    """
+    if not isinstance(system, EigenstateSystem):
+        raise ValueError(
+            'The system must be an EigenstateSystem, got {}.'.format(
+                system.__class__
+            )
+        )
+    if num_lines < 2 or num_steps < 2:
+        raise ValueError(
+            'The number of lines ({}) and steps ({}) must be at least 2.'.
+            format(num_lines, num_steps)
+        )
+    t1_values = np.linspace(0, 1, num_lines)
+    t2_values = np.linspace(0, 1, num_steps)
+    kpt_lines = [[surface(t1, t2) for t2 in t2_values] for t1 in t1_values]
+    for t1, kpt in zip(t1_values, kpt_lines):
+        delta = np.array(kpt[-1]) - np.array(kpt[0])
+        if not np.isclose(np.round(delta), delta).all():
+            raise ValueError(
+                'Start and end points of the line at t1={} differ by {}, which is not an inverse lattice vector.'.
+                format(t1, delta)
+            )
+
+    # shape (num_lines, num_steps, num_bands, num_orbitals), with the
+    # eigenstates as rows
+    eigs = np.array(system.get_eig_lines(kpt_lines))
+    # overlap determinants along the lines (t2) and between lines (t1)
+    link_2 = _overlap_det(eigs[:, :-1], eigs[:, 1:])
+    link_1 = _overlap_det(eigs[:-1], eigs[1:])
+    berry_flux = np.angle(
+        link_1[:, :-1] * link_2[1:] * np.conjugate(link_1[:, 1:]) *
+        np.conjugate(link_2[:-1])
+    )
+    return np.sum(berry_flux) / (2 * np.pi), berry_flux
+
+def _overlap_det(eigs_a, eigs_b):
+    """
+    Returns the determinants of the overlap matrices between stacked arrays of eigenstates.
+    """
+    return np.linalg.det(
+        np.matmul(np.conjugate(eigs_a), np.swapaxes(eigs_b, -1, -2))
+    )
+
+def _get_offsets(lengths):
+    """
+    Returns the offsets of consecutive blocks with the given lengths.
+    """
+    offsets = np.zeros(len(lengths) + 1, dtype=int)
+    offsets[1:] = np.cumsum(lengths)
+    return offsets
+
+def _get_surface_array(surface, key):
+    """
+    Returns the array of a given key, for a surface result or an array.
+    """
+    if isinstance(surface, (SurfaceResult, SurfaceData)):
+        return surface.get_array(key)
+    return np.array(surface, dtype=float, ndmin=1)
+
+def _get_z2_arrays(surface):
+    """
+    Returns the arrays needed to compute the Z2 invariant, for a surface result or a tuple of arrays.
+    """
+    if isinstance(surface, (SurfaceResult, SurfaceData)):
+        return (surface.get_array('gap_pos'), *surface.get_wcc_array())
+    gap_pos, wcc, offsets = surface
+    gap_pos = np.array(gap_pos, dtype=float, ndmin=1)
+    wcc = np.array(wcc, dtype=float, ndmin=1)
+    offsets = np.array(offsets, dtype=int, ndmin=1)
+    if len(offsets) != len(gap_pos) + 1:
+        raise ValueError(
+            'The length of offsets ({}) must be one more than the number of gap positions ({}).'.
+            format(len(offsets), len(gap_pos))
+        )
+    return gap_pos, wcc[offsets[0]:offsets[-1]], offsets
@@ -12,6 +12,7 @@ from fsc.export import export
 # This can create a circular import if it is imported by name (from ... import ...)
 # If this is ever an issue, consider splitting the encoding by surface / line
 from ..line import LineResult, WccLineData, EigenstateLineData
+from ..line._data import BoundaryEigenstateLineData
 from ..surface._data import SurfaceData, SurfaceLine
 from ..surface._result import SurfaceResult
 
@@ -46,6 +47,14 @@ def _(obj):
         eigenstates=encode(obj.eigenstates)
     )
 
+@encode.register(BoundaryEigenstateLineData)
+def _(obj):
+    return dict(
+        __boundary_eigenstate_line_data__=True,
+        eigenstates=encode(obj.eigenstates),
+        wilson=encode(obj.wilson)
+    )
+
 @encode.register(WccLineData)
 def _(obj):
     return dict(
@@ -122,6 +131,9 @@ def decode_wcc_line_data(obj):
 def decode_eigenstate_line_data(obj):
     return EigenstateLineData(obj['eigenstates'])
 
+def decode_boundary_eigenstate_line_data(obj):
+    return BoundaryEigenstateLineData(obj['eigenstates'], np.array(obj['wilson']))
+
 def decode_complex(obj):
     return complex(obj['real'], obj['imag'])
 
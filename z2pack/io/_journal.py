@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Serializer for surface results which are saved as an append-only journal. The journal is a stream of :py:mod:`msgpack` records, each of which contains a new or updated line and / or the current state of the surface controls. When loading, the records are replayed in order. An incomplete record at the end of the file, as left by an interrupted write, is ignored.
+
+Like the :py:mod:`json`, :py:mod:`msgpack` and :py:mod:`pickle` modules, it provides ``dump`` and ``load`` functions, for writing and reading a compacted journal.
+"""
+
+import os
+import logging
+import tempfile
+
+import msgpack
+
+from . import _encoding
+from ..surface._data import SurfaceData, SurfaceLine
+from ..surface._result import SurfaceResult
+
+_LOGGER = logging.getLogger(__name__)
+
+def _pack(record):
+    return msgpack.packb(record, default=_encoding.encode, use_bin_type=True)
+
+def _snapshot_records(obj):
+    """
+    Returns the records of a compacted journal for the given surface result.
+    """
+    if not isinstance(obj, SurfaceResult):
+        raise TypeError('Only surface results can be saved as a journal, got {}.'.format(type(obj)))
+    records = [dict(line=line) for line in obj.data.lines]
+    records.append(dict(
+        ctrl_states=obj.ctrl_states,
+        ctrl_convergence=obj.ctrl_convergence
+    ))
+    return records
+
+def dump(obj, f):
+    """
+    Writes the surface result to the binary file ``f``, as a compacted journal.
+    """
+    for record in _snapshot_records(obj):
+        f.write(_pack(record))
+
+def load(f):
+    """
+    Reads a surface result from the binary file ``f`` by replaying the journal.
+    """
+    lines = dict()
+    ctrl_states = dict()
+    ctrl_convergence = dict()
+    unpacker = msgpack.Unpacker(f, object_hook=_encoding.decode, raw=False)
+    try:
+        for record in unpacker:
+            if 'line' in record:
+                line = record['line']
+                lines[line.t] = line
+            if 'ctrl_states' in record:
+                ctrl_states = record['ctrl_states']
+                ctrl_convergence = record['ctrl_convergence']
+    except ValueError as err:
+        _LOGGER.warning('Stopped reading the journal at an invalid record: {}'.format(err))
+    # the states / convergence of the controls are set manually
+    res = SurfaceResult(SurfaceData(lines.values()), [], [])
+    res.ctrl_states = ctrl_states
+    res.ctrl_convergence = ctrl_convergence
+    return res
+
+def compact(file_path):
+    """
+    Rewrites the journal in ``file_path`` such that it contains only one record per line. The file is replaced atomically.
+
+    :param file_path:   Path to the journal file.
+    :type file_path:    str
+    """
+    with open(file_path, 'rb') as f:
+        result = load(f)
+    _write_atomic(result, file_path)
+    return result
+
+def _write_atomic(obj, file_path):
+    """
+    Writes a compacted journal to a temporary file, and then moves it to ``file_path``.
+    """
+    dirname = os.path.dirname(os.path.abspath(file_path))
+    with tempfile.NamedTemporaryFile(dir=dirname, delete=False) as f:
+        tmp_path = f.name
+        try:
+            dump(obj, f)
+            f.flush()
+            os.fsync(f.fileno())
+        except Exception as err:
+            f.close()
+            os.remove(tmp_path)
+            raise err
+    os.replace(tmp_path, file_path)
+
+class JournalWriter:
+    """
+    Appends records for new or updated lines to a journal file. The file is first replaced by a compacted journal of the initial result.
+
+    :param file_path:   Path to the journal file.
+    :type file_path:    str
+
+    :param init_result: Result which the journal starts from.
+    :type init_result:  :class:`.SurfaceResult`
+    """
+    def __init__(self, file_path, init_result):
+        self._file_path = file_path
+        _write_atomic(init_result, file_path)
+        self._file = open(file_path, 'ab')
+
+    def add_line(self, t, line_result, result):
+        """
+        Appends a record containing the line at position ``t`` and the control states of the surface ``result``. The record is flushed to disk before returning.
+        """
+        _LOGGER.info('Appending line at t = {} to journal {}'.format(t, self._file_path))
+        self._file.write(_pack(dict(
+            line=SurfaceLine(t, line_result),
+            ctrl_states=result.ctrl_states,
+            ctrl_convergence=result.ctrl_convergence
+        )))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Serializer which stores the WCC, eigenstates and Wilson loops of Z2Pack results as native arrays in a NumPy ``.npz`` file. The remaining structure of the result is stored as a JSON string. Like the :py:mod:`json`, :py:mod:`msgpack` and :py:mod:`pickle` modules, it provides ``dump`` and ``load`` functions.
+
+The JSON structure contains the position and control states of each line, and refers to the arrays by their name. It serves as an index of the lines, which allows :func:`load_lazy` to read the arrays of a line only when they are needed.
+"""
+
+import json
+
+import numpy as np
+
+from . import _encoding
+from ..line import LineResult, WccLineData, EigenstateLineData
+from ..line._data import BoundaryEigenstateLineData
+from ..surface._data import SurfaceLine
+
+__all__ = ['dump', 'load', 'load_lazy']
+
+_STRUCTURE_KEY = '__structure__'
+_LINE_DATA_MARKERS = [
+    '__wcc_line_data__', '__eigenstate_line_data__',
+    '__boundary_eigenstate_line_data__'
+]
+
+def dump(obj, f):
+    """
+    Writes the object to the binary file ``f``.
+    """
+    arrays = dict()
+
+    def add_array(array):
+        key = 'array_{}'.format(len(arrays))
+        arrays[key] = np.asarray(array)
+        return dict(__array__=key)
+
+    def encode(obj):
+        if isinstance(obj, EigenstateLineData):
+            res = dict(eigenstates=add_array(obj.eigenstates))
+            if isinstance(obj, BoundaryEigenstateLineData):
+                res['__boundary_eigenstate_line_data__'] = True
+            else:
+                res['__eigenstate_line_data__'] = True
+            # only stored if they were already computed
+            for key in ['wilson', 'wcc']:
+                value = obj._get_computed(key)  # pylint: disable=protected-access
+                if value is not None:
+                    res[key] = add_array(value)
+            return res
+        if isinstance(obj, WccLineData):
+            return dict(__wcc_line_data__=True, wcc=add_array(obj.wcc))
+        res = _encoding.encode(obj)
+        # the line data is encoded directly by _encoding.encode, it is put
+        # back here s.t. this function is called on it again
+        if isinstance(obj, LineResult):
+            res['data'] = obj.data
+        elif isinstance(obj, SurfaceLine):
+            res['result'] = obj.result
+        return res
+
+    structure = json.dumps(obj, default=encode)
+    arrays[_STRUCTURE_KEY] = np.array(structure)
+    np.savez(f, **arrays)
+
+def load(f):
+    """
+    Reads an object from the binary file ``f``.
+    """
+    with np.load(f, allow_pickle=False) as arrays:
+        return json.loads(
+            str(arrays[_STRUCTURE_KEY]),
+            object_hook=_get_decoder(arrays)
+        )
+
+def load_lazy(file_path):
+    """
+    Reads an object from the file given in ``file_path``, without reading the arrays of the line results. The :class:`.LineResult` objects read their arrays from the file on first access. When only the WCC (or properties derived from them, like ``pol``, ``gap_pos`` and ``gap_size``) are accessed, the eigenstates are not read. The file is kept open until the object is garbage collected.
+
+    :param file_path:   Path to the file.
+    :type file_path:    str
+    """
+    arrays = np.load(file_path, allow_pickle=False)
+    return json.loads(
+        str(arrays[_STRUCTURE_KEY]),
+        object_hook=_get_decoder(arrays, lazy=True)
+    )
+
+def _get_decoder(arrays, lazy=False):
+    """
+    Returns the hook which decodes the JSON structure, reading the arrays from ``arrays``. If ``lazy`` is true, the data of the line results is left undecoded, and :class:`_LazyLineResult` objects are created instead.
+    """
+    def decode(obj):
+        if set(obj.keys()) == {'__array__'}:
+            if lazy:
+                return obj
+            return arrays[obj['__array__']]
+        if any(marker in obj for marker in _LINE_DATA_MARKERS):
+            if lazy:
+                return obj
+            return _decode_line_data(obj)
+        if lazy and '__line_result__' in obj:
+            return _LazyLineResult(obj, arrays)
+        return _encoding.decode(obj)
+
+    return decode
+
+def _decode_line_data(obj):
+    """
+    Creates the line data from the structure, where the arrays have already been read.
+    """
+    if '__wcc_line_data__' in obj:
+        return WccLineData(obj['wcc'])
+    if '__boundary_eigenstate_line_data__' in obj:
+        res = _encoding.decode_boundary_eigenstate_line_data(obj)
+    else:
+        res = _encoding.decode_eigenstate_line_data(obj)
+    # pylint: disable=protected-access
+    if 'wilson' in obj:
+        res._set_computed(wilson=obj['wilson'])
+    if 'wcc' in obj:
+        res._set_computed(wcc=obj['wcc'])
+    return res
+
+def _line_result(data, ctrl_states, ctrl_convergence):
+    """
+    Creates a :class:`.LineResult` with the given data and control states.
+    """
+    res = LineResult(data, [], [])
+    res.ctrl_states = ctrl_states
+    res.ctrl_convergence = ctrl_convergence
+    return res
+
+class _LazyLineResult(LineResult):
+    """
+    Line result which reads its data from the file on first access. If only WCC-derived properties are accessed and the WCC are stored in the file, only the WCC array is read. It is pickled / copied as a regular :class:`.LineResult`.
+    """
+    _WCC_PROPERTIES = ['wcc', 'pol', 'gap_pos', 'gap_size']
+
+    def __init__(self, obj, arrays):  # pylint: disable=super-init-not-called
+        self._raw_data = obj['data']
+        self._arrays = arrays
+        self.ctrl_states = obj['ctrl_states']
+        self.ctrl_convergence = obj['ctrl_convergence']
+
+    def _read(self, key):
+        return self._arrays[self._raw_data[key]['__array__']]
+
+    @property
+    def data(self):
+        if '_data' not in vars(self):
+            self._data = _decode_line_data({
+                key: self._read(key) if isinstance(value, dict) else value
+                for key, value in self._raw_data.items()
+            })
+        return self._data
+
+    def __getattr__(self, name):
+        if (
+            name in self._WCC_PROPERTIES and '_data' not in vars(self)
+            and 'wcc' in self._raw_data
+        ):
+            if '_wcc_data' not in vars(self):
+                self._wcc_data = WccLineData(self._read('wcc'))
+            return getattr(self._wcc_data, name)
+        return super().__getattr__(name)
+
+    def __reduce__(self):
+        return (
+            _line_result,
+            (self.data, self.ctrl_states, self.ctrl_convergence)
+        )
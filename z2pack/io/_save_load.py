@@ -1,13 +1,79 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
+import tempfile
+
 from fsc.iohelper import SerializerDispatch
 
 from . import _encoding
+from . import _npz as npz
+from . import _journal as journal
 
-__all__ = ['save', 'load']
+__all__ = ['save', 'load', 'compact_journal', 'npz', 'journal']
 
 IO_HANDLER = SerializerDispatch(_encoding)
 
-save = IO_HANDLER.save
-load = IO_HANDLER.load
+# serializers which are handled by Z2Pack itself, by file ending
+_OWN_SERIALIZERS = {'.npz': npz, '.journal': journal}
+
+def _get_own_serializer(file_path, serializer):
+    """
+    Returns the Z2Pack serializer which should be used, either because it is given explicitly or because of the file ending. Returns ``None`` if the serializer is handled by :py:mod:`fsc.iohelper`.
+    """
+    if serializer == 'auto':
+        return _OWN_SERIALIZERS.get(os.path.splitext(file_path)[1].lower())
+    if serializer in _OWN_SERIALIZERS.values():
+        return serializer
+    return None
+
+def save(obj, file_path, serializer='auto'):
+    """Saves an object to the file given in ``file_path``. The saving is made atomic (on systems where :py:func:`os.replace` is atomic) by first creating a temporary file and then moving to the ``file_path``.
+
+    :param obj:         Object to be saved.
+
+    :param file_path:   Path to the file.
+    :type file_path:    str
+
+    :param serializer:  The serializer to be used. Valid options are :py:mod:`msgpack`, :py:mod:`json`, :py:mod:`pickle`, :py:mod:`z2pack.io.npz`, which stores eigenstates and WCC as NumPy arrays, and :py:mod:`z2pack.io.journal` (for surface results only). By default, the serializer is determined from the file extension. If this does not work, :py:mod:`json` is used to avoid data loss.
+    :type serializer:   module
+    """
+    own_serializer = _get_own_serializer(file_path, serializer)
+    if own_serializer is None:
+        return IO_HANDLER.save(obj, file_path, serializer=serializer)
+    dirname = os.path.dirname(os.path.abspath(file_path))
+    if not os.path.isdir(dirname):
+        raise ValueError('Directory {} does not exist'.format(dirname))
+    with tempfile.NamedTemporaryFile(dir=dirname, delete=False) as f:
+        tmp_path = f.name
+        try:
+            own_serializer.dump(obj, f)
+        except Exception as err:
+            f.close()
+            os.remove(tmp_path)
+            raise err
+    os.replace(tmp_path, file_path)
+
+def load(file_path, serializer='auto', *, lazy=False):
+    """Loads the object that was saved to ``file_path``.
+
+    :param file_path:   Path to the file.
+    :type file_path:    str
+
+    :param serializer:  The serializer which should be used to load the result. By default, is deduced from the file extension. If no serializer is given and it cannot be deduced from the file ending, a :py:class:`ValueError` is raised, to avoid loading corrupted data.
+    :type serializer:   module
+
+    :param lazy:    If ``True``, the arrays of the line results are read from the file only when they are accessed, and only the WCC are read if no other data is needed. This is supported only for the :py:mod:`z2pack.io.npz` serializer. The file must not be modified while the result is in use.
+    :type lazy:     bool
+    """
+    own_serializer = _get_own_serializer(file_path, serializer)
+    if lazy:
+        if own_serializer is not npz:
+            raise ValueError('Lazy loading is supported only for the z2pack.io.npz serializer.')
+        return npz.load_lazy(file_path)
+    if own_serializer is None:
+        return IO_HANDLER.load(file_path, serializer=serializer)
+    with open(file_path, 'rb') as f:
+        return own_serializer.load(f)
+
+compact_journal = journal.compact
@@ -8,7 +8,8 @@ _LOGGER = _logging.getLogger(__name__)
 
 from ._data import WccLineData, EigenstateLineData
 from ._result import LineResult
+from ._steps import nested_steps
 
 from ._run import run_line as run
 
-__all__ = ['run'] + _data.__all__ + _result.__all__
+__all__ = ['run'] + _data.__all__ + _result.__all__ + _steps.__all__
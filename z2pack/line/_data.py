@@ -4,29 +4,15 @@
 import functools
 
 import numpy as np
-import scipy.linalg as la
 from fsc.export import export
-from fsc.locker import ConstLocker, change_lock
 
-from .._utils import _gapfind
+from .._utils import _gapfind, _gapfind_batch
 
-class _LazyProperty:
-    """Descriptor that replaces itself with the return value of the method when accessed. The class is unlocked before setting the attribute, s.t. it can be used with a Locker type class."""
-    def __init__(self, method):
-        self.method = method
-
-    def __get__(self, instance, owner):
-        if not instance:
-            return None
-
-        value = self.method(instance)
-
-        with change_lock(instance, 'none'):
-            setattr(instance, self.method.__name__, value)
-        return value
+# marks the lazily computed values which have not been computed yet
+_UNSET = object()
 
 @export
-class WccLineData(metaclass=ConstLocker):
+class WccLineData:
     """Data container for a line constructed directly from the WCC, or from the overlap matrices via the :meth:`from_overlaps` method. The following attributes and properties can be accessed:
 
     * ``wcc`` : A list of Wannier charge centers.
@@ -34,47 +20,119 @@ class WccLineData(metaclass=ConstLocker):
     * ``gap_pos`` : The position of the largest gap between any two WCC.
     * ``gap_size``: The size of the largest gap between any two WCC.
 
+    The WCC are stored as a read-only ``float64`` array, and the derived properties are computed on first access. The data cannot be modified.
+
     .. note::
 
         The WCC are given in reduced coordinates, which means the possible values range from 0 to 1. The same is true for all values derived from the WCC.
 
     """
+    __slots__ = ['_wcc', '_wcc_list', '_pol', '_gap_pos', '_gap_size']
+
     def __init__(self, wcc):
-        self.wcc = wcc
+        self._init_slots()
+        self._wcc = _read_only(np.asarray(wcc, dtype=float), copy=True)
+
+    def _init_slots(self):
+        for slot in self._slot_names():
+            object.__setattr__(self, slot, _UNSET)
+
+    @classmethod
+    def _slot_names(cls):
+        return [
+            slot for klass in cls.__mro__
+            for slot in getattr(klass, '__slots__', [])
+        ]
+
+    def __getstate__(self):
+        # the list of WCC is re-created from the array when needed
+        return {
+            slot: getattr(self, slot)
+            for slot in self._slot_names()
+            if slot != '_wcc_list' and getattr(self, slot) is not _UNSET
+        }
+
+    def __setstate__(self, state):
+        self._init_slots()
+        # results pickled with previous versions contain the (public)
+        # attributes and the lock type
+        state = dict(state)
+        state.pop('attr_mod_ctrl', None)
+        self._set_computed(**{key.lstrip('_'): value for key, value in state.items()})
+
+    def _set_computed(self, **values):
+        """
+        Sets the values of the given properties, s.t. they are not computed again.
+        """
+        for key, value in values.items():
+            if key == 'wcc':
+                value = _read_only(np.asarray(value, dtype=float), copy=True)
+            elif key in ['eigenstates', 'wilson', 'wilson_eigenstates']:
+                value = _read_only(value)
+            setattr(self, '_' + key, value)
+
+    def _get_computed(self, key):
+        """
+        Returns the value of the given property if it was computed already, or ``None`` otherwise.
+        """
+        value = getattr(self, '_' + key, _UNSET)
+        return None if value is _UNSET else value
 
     @classmethod
     def from_overlaps(cls, overlaps):
         r"""Creates a :class:`WccLineData` object from a list containing the overlap matrices :math:`M_{m,n}^{\mathbf{k}, \mathbf{k+b}} = \langle u_n^\mathbf{k} | u_m^\mathbf{k+b} \rangle`."""
-        return cls(cls._calculate_wannier(cls._wilson(overlaps))[0])
+        return cls(cls._calculate_wannier(cls._wilson_from_overlaps(overlaps))[0])
+
+    @classmethod
+    def from_overlaps_batch(cls, overlaps):
+        r"""Creates a list of :class:`WccLineData` objects from the overlap matrices of several lines, given as an array of shape ``(L, N, m, m)`` for ``L`` lines with ``N`` overlap matrices each. The Wilson loops, WCC, gaps and polarizations of all lines are computed together."""
+        wilson = _wilson_batch(overlaps)
+        wcc, _ = _wannier_batch(wilson)
+        res = [cls(line_wcc) for line_wcc in wcc]
+        _set_wcc_properties(res, wcc)
+        return res
 
     @staticmethod
     def _calculate_wannier(wilson):
-        eigs, eigvec = la.eig(wilson)
-        wcc = np.array([np.angle(z) / (2 * np.pi) % 1 for z in eigs])
-        idx = np.argsort(wcc)
-        return list(wcc[idx]), list(eigvec.T[idx])
+        wcc, eigvec = _wannier_batch(np.array([wilson]))
+        return wcc[0], eigvec[0]
 
     @staticmethod
-    def _wilson(overlaps):
+    def _wilson_from_overlaps(overlaps):
         return functools.reduce(np.dot, overlaps)
 
-    @_LazyProperty
+    @property
+    def wcc(self):
+        if self._wcc_list is _UNSET:
+            self._wcc_list = self._get_wcc().tolist()
+        return self._wcc_list
+
+    def _get_wcc(self):
+        """
+        Returns the WCC as an array.
+        """
+        return self._wcc
+
+    @property
     def pol(self):
-        return sum(self.wcc) % 1
+        if self._pol is _UNSET:
+            self._pol = sum(self.wcc) % 1
+        return self._pol
 
-    @_LazyProperty
+    @property
     def gap_pos(self):
-        self._calculate_gap()
-        return self.gap_pos
+        if self._gap_pos is _UNSET:
+            self._calculate_gap()
+        return self._gap_pos
 
-    @_LazyProperty
+    @property
     def gap_size(self):
-        self._calculate_gap()
-        return self.gap_size
+        if self._gap_size is _UNSET:
+            self._calculate_gap()
+        return self._gap_size
 
     def _calculate_gap(self):
-        with change_lock(self, 'none'):
-            self.gap_pos, self.gap_size = _gapfind(self.wcc)
+        self._gap_pos, self._gap_size = _gapfind(self._get_wcc())
 
     def __getattr__(self, name):
         if name == 'eigenstates':
@@ -85,36 +143,158 @@ class WccLineData(metaclass=ConstLocker):
 class EigenstateLineData(WccLineData):
     r"""Data container for a line constructed from periodic eigenstates :math:`|u_{n, \mathbf{k}} \rangle`. This has all attributes that :class:`WccLineData` has, and the following additional ones:
 
+    * ``eigenstates`` : The eigenstates, as a read-only array of shape ``(N, m, n)`` for ``N`` k-points, ``m`` bands and ``n`` basis states. The eigenstates at each k-point are given as rows.
     * ``wilson`` : An array containing the Wilson loop (product of overlap matrices) for the line. The Wilson loop is given in the basis of the eigenstates at the start / end of the line.
-    * ``wilson_eigenstates`` : Eigenstates of the Wilson loop, given as a list of 1D - arrays.
+    * ``wilson_eigenstates`` : Eigenstates of the Wilson loop, given as rows of a 2D array.
     """
-    def __init__(self, eigenstates):
-        self.eigenstates = eigenstates
+    __slots__ = ['_eigenstates', '_wilson', '_wilson_eigenstates']
 
-    @_LazyProperty
-    def wilson(self):
-        # create overlaps
-        overlaps = []
+    def __init__(self, eigenstates):  # pylint: disable=super-init-not-called
+        self._init_slots()
+        self._eigenstates = _read_only(eigenstates)
 
-        for eig1, eig2 in zip(self.eigenstates, self.eigenstates[1:]):
-            overlaps.append(np.dot(
-                np.conjugate(eig1),
-                np.array(eig2).T
-            ))
-        return self._wilson(overlaps)
+    @property
+    def eigenstates(self):
+        return self._eigenstates
 
-    @_LazyProperty
-    def wcc(self):
-        self._calculate_wannier()
-        return self.wcc
+    @property
+    def wilson(self):
+        if self._wilson is _UNSET:
+            self._wilson = _read_only(_accumulate_wilson(self._eigenstates)[0])
+        return self._wilson
+
+    def _get_wcc(self):
+        if self._wcc is _UNSET:
+            self._calculate_wannier()
+        return self._wcc
 
-    @_LazyProperty
+    @property
     def wilson_eigenstates(self):
-        self._calculate_wannier()
-        return self.wilson_eigenstates
+        if self._wilson_eigenstates is _UNSET:
+            self._calculate_wannier()
+        return self._wilson_eigenstates
+
+    @classmethod
+    def from_eigenstates_batch(cls, eigenstates):
+        """Creates a list of :class:`EigenstateLineData` objects from the eigenstates of several lines, which must all have the same number of k-points and bands. The Wilson loops, WCC, gaps and polarizations of all lines are computed together. The eigenstates of each line are stored in a separate array, s.t. they can be released independently.
+
+        :param eigenstates: Eigenstates for each of the lines.
+        :type eigenstates:  list
+        """
+        stacked = np.array(eigenstates)
+        overlaps = np.matmul(
+            np.conjugate(stacked[:, :-1]),
+            np.swapaxes(stacked[:, 1:], -1, -2)
+        )
+        wilson = _wilson_batch(overlaps)
+        wcc, wilson_eigenstates = _wannier_batch(wilson)
+        # the eigenstates are copied, because a view would keep the
+        # eigenstates of all lines in memory
+        res = [
+            cls(_read_only(line_eigenstates, copy=True))
+            for line_eigenstates in stacked
+        ]
+        for data, line_wilson, line_wcc, line_w_eigenstates in zip(
+                res, wilson, wcc, wilson_eigenstates
+        ):
+            data._set_computed(  # pylint: disable=protected-access
+                wilson=line_wilson,
+                wcc=line_wcc,
+                wilson_eigenstates=line_w_eigenstates
+            )
+        _set_wcc_properties(res, wcc)
+        return res
 
     def _calculate_wannier(self):
         wcc, wilson_eigenstates = super()._calculate_wannier(self.wilson)
-        with change_lock(self, 'none'):
-            self.wcc = wcc
-            self.wilson_eigenstates = wilson_eigenstates
+        self._set_computed(wcc=wcc, wilson_eigenstates=wilson_eigenstates)
+
+class BoundaryEigenstateLineData(EigenstateLineData):
+    r"""Data container for a line where only the eigenstates at the start and end of the line are kept, which is created by the ``'boundary'`` eigenstate retention policy. Since the Wilson loop cannot be computed from these eigenstates, it is stored explicitly. Otherwise, it has the same attributes as :class:`EigenstateLineData`.
+    """
+    __slots__ = []
+
+    def __init__(self, eigenstates, wilson):
+        super().__init__(eigenstates)
+        self._wilson = _read_only(np.asarray(wilson))
+
+    @classmethod
+    def from_eigenstate_iterable(cls, eigenstates):
+        """Creates a :class:`BoundaryEigenstateLineData` object from an iterable of eigenstates along the line. The Wilson loop is accumulated while iterating, s.t. only the eigenstates at the start and end of the line are stored."""
+        wilson, first, last = _accumulate_wilson(eigenstates)
+        return cls([first, last], wilson)
+
+def _read_only(array, *, copy=False):
+    """
+    Returns a read-only version of the array. If ``copy`` is set, the array is copied. Otherwise, a writeable array is wrapped in a read-only view instead of changing the flag of the given array.
+    """
+    if copy:
+        array = np.array(array)
+    else:
+        array = np.asanyarray(array)
+        if array.flags.writeable:
+            array = array.view()
+    array.flags.writeable = False
+    return array
+
+def _copy_computed(source, target):
+    """
+    Copies the properties which were already computed from the eigenstates, s.t. they are not computed again.
+    """
+    for key in [
+            'wilson', 'wcc', 'wilson_eigenstates', 'pol', 'gap_pos', 'gap_size'
+    ]:
+        value = source._get_computed(key)  # pylint: disable=protected-access
+        if value is not None:
+            target._set_computed(**{key: value})  # pylint: disable=protected-access
+
+def _accumulate_wilson(eigenstates):
+    """
+    Computes the Wilson loop from an iterable of eigenstates, by multiplying the overlap matrices between neighbouring eigenstates as they are given. Returns the Wilson loop, and the first and last eigenstates.
+    """
+    eigenstates = iter(eigenstates)
+    first = last = next(eigenstates)
+    wilson = None
+    for eig in eigenstates:
+        overlap = np.dot(np.conjugate(last), np.array(eig).T)
+        wilson = overlap if wilson is None else np.dot(wilson, overlap)
+        last = eig
+    return wilson, first, last
+
+def _wilson_batch(overlaps):
+    """
+    Computes the Wilson loops from an array of overlap matrices with shape ``(L, N, m, m)``, by multiplying the overlap matrices of all lines at once.
+    """
+    overlaps = np.asarray(overlaps)
+    wilson = overlaps[:, 0]
+    for i in range(1, overlaps.shape[1]):
+        wilson = np.matmul(wilson, overlaps[:, i])
+    return wilson
+
+def _wannier_batch(wilson):
+    """
+    Computes the sorted WCC and the corresponding eigenstates of the Wilson loops, given as an array of shape ``(L, m, m)``. The eigenstates of each line are given as rows.
+    """
+    eigs, eigvec = np.linalg.eig(wilson)
+    wcc = np.angle(eigs) / (2 * np.pi) % 1
+    idx = np.argsort(wcc, axis=-1)
+    wcc = np.take_along_axis(wcc, idx, axis=-1)
+    eigvec = np.take_along_axis(
+        np.swapaxes(eigvec, -1, -2), idx[..., np.newaxis], axis=-2
+    )
+    return wcc, eigvec
+
+def _set_wcc_properties(data_list, wcc):
+    """
+    Sets the polarization and the position and size of the largest gap for a list of line data, given the sorted WCC of all lines as an array of shape ``(L, m)``.
+    """
+    # the cumulative sum is used because it adds up the WCC in order, the
+    # same way as the built-in sum
+    pol = np.cumsum(wcc, axis=-1)[:, -1] % 1
+    gap_pos, gap_size = _gapfind_batch(wcc)
+    for data, line_pol, line_gap_pos, line_gap_size in zip(
+            data_list, pol, gap_pos, gap_size
+    ):
+        data._set_computed(  # pylint: disable=protected-access
+            pol=line_pol, gap_pos=line_gap_pos, gap_size=line_gap_size
+        )
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Defines the policies which determine how the eigenstates of a converged line calculation are kept.
+"""
+
+import tempfile
+
+import numpy as np
+
+from ._data import (
+    EigenstateLineData, BoundaryEigenstateLineData, _copy_computed
+)
+from ._result import LineResult
+
+class _EigenstateRetention:
+    """
+    Applies the eigenstate retention policy to line results.
+
+    :param policy:  Name of the policy, one of ``'all'``, ``'boundary'``, ``'memmap'`` or ``'streaming'``.
+    :type policy:   str
+
+    :param max_bytes:   Size of the eigenstates (summed over all lines) which are kept in memory with the ``'memmap'`` policy.
+    :type max_bytes:    int
+    """
+    _POLICIES = ['all', 'boundary', 'memmap', 'streaming']
+
+    def __init__(self, policy='all', max_bytes=0):
+        if policy not in self._POLICIES:
+            raise ValueError("Invalid eigenstate retention policy '{}', must be one of {}.".format(policy, ', '.join(self._POLICIES)))
+        self.policy = policy
+        self.max_bytes = max_bytes
+        self._num_bytes = 0
+
+    @property
+    def streaming(self):
+        """
+        Determines whether the eigenstates are not stored during the calculation, but the Wilson loop is accumulated while they are computed.
+        """
+        return self.policy == 'streaming'
+
+    def apply(self, result):
+        """
+        Returns a :class:`.LineResult` with the same control states and convergence as ``result``, where the policy has been applied to its data.
+        """
+        data = self._apply_data(result.data)
+        if data is result.data:
+            return result
+        res = LineResult(data, [], [])
+        res.ctrl_states = result.ctrl_states
+        res.ctrl_convergence = result.ctrl_convergence
+        return res
+
+    def _apply_data(self, data):
+        # data which was already reduced, or does not contain eigenstates
+        # is left unchanged
+        if (
+            self.policy == 'all' or type(data) is not EigenstateLineData or
+            isinstance(data.eigenstates, np.memmap)
+        ):
+            return data
+        if self.policy in ['boundary', 'streaming']:
+            res = BoundaryEigenstateLineData(
+                [data.eigenstates[0], data.eigenstates[-1]], data.wilson
+            )
+        else:
+            eigenstates = np.asarray(data.eigenstates)
+            if self._num_bytes + eigenstates.nbytes <= self.max_bytes:
+                self._num_bytes += eigenstates.nbytes
+                return data
+            res = EigenstateLineData(_to_memmap(eigenstates))
+        _copy_computed(data, res)
+        return res
+
+def _to_memmap(array):
+    """
+    Copies the array to a read-only memory-mapped temporary file. The file is removed when the array is no longer used.
+    """
+    # the memory map stays valid after the file is closed
+    with tempfile.TemporaryFile() as f:
+        res = np.memmap(f, dtype=array.dtype, mode='w+', shape=array.shape)
+        res[:] = array
+        res.flush()
+    res.flags.writeable = False
+    return res
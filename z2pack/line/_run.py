@@ -4,6 +4,7 @@
 import os
 import time
 import contextlib
+import collections
 
 import numpy as np
 from fsc.export import export
@@ -11,8 +12,11 @@ from fsc.export import export
 from . import _LOGGER
 from . import LineResult
 from . import EigenstateLineData, WccLineData
+from ._data import BoundaryEigenstateLineData
+from ._retention import _EigenstateRetention
 from ._control import StepCounter, PosCheck, ForceFirstUpdate
 
+from ..system import EigenstateSystem
 from .._control import (
     StatefulControl,
     IterationControl,
@@ -38,7 +42,9 @@ def run_line(
         init_result=None,
         load=False,
         load_quiet=True,
-        serializer='auto'
+        serializer='auto',
+        eigenstate_retention='all',
+        eigenstate_max_bytes=0
 ):
     """
     Calculates the Wannier charge centers for a given system and line, automatically converging w.r.t. the number of k-points along the line.
@@ -51,7 +57,7 @@ def run_line(
     :param pos_tol:     The maximum movement of a WCC for the iteration w.r.t. the number of k-points in a single string to converge. The iteration can be turned off by setting ``pos_tol=None``.
     :type pos_tol:      float
 
-    :param iterator:    Generator for the number of points in a k-point string. The iterator should also take care of the maximum number of iterations. It is needed even when ``pos_tol=None``, to provide a starting value.
+    :param iterator:    Generator for the number of points in a k-point string. The iterator should also take care of the maximum number of iterations. It is needed even when ``pos_tol=None``, to provide a starting value. For systems providing eigenstates, the eigenstates at k-points which were already computed are re-used. Use :func:`.nested_steps` to get strings which contain all k-points of the previous one.
 
     :param save_file:   Path to a file where the result should be stored.
     :type save_file:    str
@@ -65,9 +71,15 @@ def run_line(
     :param load_quiet:  Determines whether errors / inexistent files are ignored when loading from ``save_file``
     :type load_quiet:   bool
 
-    :param serializer:  Serializer which is used to save the result to file. Valid options are :py:mod:`msgpack`, :py:mod:`json` and :py:mod:`pickle`. By default (``serializer='auto'``), the serializer is inferred from the file ending. If this fails, :py:mod:`msgpack` is used.
+    :param serializer:  Serializer which is used to save the result to file. Valid options are :py:mod:`msgpack`, :py:mod:`json`, :py:mod:`pickle` and :py:mod:`z2pack.io.npz` (which stores the eigenstates and WCC as NumPy arrays). By default (``serializer='auto'``), the serializer is inferred from the file ending. If this fails, :py:mod:`msgpack` is used.
     :type serializer:   module
 
+    :param eigenstate_retention:    Determines how the eigenstates are kept in the result once the line calculation is finished. With ``'all'``, all eigenstates are kept in memory. With ``'boundary'``, only the eigenstates at the start and end of the line are kept, together with the Wilson loop. With ``'memmap'``, the eigenstates are moved to a temporary memory-mapped file once their size exceeds ``eigenstate_max_bytes``. With ``'streaming'``, the eigenstates are not stored even during the calculation: they are computed one k-point at a time (see :meth:`.EigenstateSystem.iter_eig`), and the Wilson loop is accumulated on the fly. The result is the same as for ``'boundary'``, but the eigenstates are not re-used when the number of k-points is increased. The properties derived from the eigenstates (``wilson``, ``wcc``, ``wilson_eigenstates``) can be used for all policies. This has no effect for systems which provide only overlap matrices.
+    :type eigenstate_retention:     str
+
+    :param eigenstate_max_bytes:    Size (in bytes) of the eigenstates which are kept in memory with the ``'memmap'`` retention policy.
+    :type eigenstate_max_bytes:     int
+
     :returns:   :class:`LineResult` instance.
 
     Example usage:
@@ -114,7 +126,11 @@ def run_line(
         if not os.path.isdir(dirname):
             raise ValueError('Directory {} does not exist.'.format(dirname))
 
-    return _run_line_impl(*controls, system=system, line=line, save_file=save_file, init_result=init_result)
+    retention = _EigenstateRetention(
+        eigenstate_retention, max_bytes=eigenstate_max_bytes
+    )
+
+    return _run_line_impl(*controls, system=system, line=line, save_file=save_file, init_result=init_result, retention=retention)
 
 
 def _run_line_impl(
@@ -123,7 +139,8 @@ def _run_line_impl(
         line,
         save_file=None,
         init_result=None,
-        serializer='auto'
+        serializer='auto',
+        retention=None
 ):
     """
     Implementation of the line's run.
@@ -133,82 +150,294 @@ def _run_line_impl(
 
     The other parameters are the same as for :meth:`.run`.
     """
-    # This is here to avoid circular import with the Surface (is solved in Python 3.5 and higher)
-    from .. import io
+    return _run_lines_impl(
+        [controls],
+        system=system,
+        lines=[line],
+        save_file=save_file,
+        init_results=[init_result],
+        serializer=serializer,
+        retention=retention
+    )[0]
+
+def _run_lines_impl(
+        line_controls,
+        *,
+        system,
+        lines,
+        save_file=None,
+        init_results=None,
+        serializer='auto',
+        retention=None
+):
+    """
+    Runs the calculation for several lines together. In each iteration, the data of all lines which are not yet converged and need the same number of k-points is computed together, using the batched methods of the line data classes. The eigenstate retention policy is applied to each line as soon as it is finished.
 
-    start_time = time.time() # timing the run
+    :param line_controls:   Control objects for each of the lines.
+    :type line_controls:    list
 
-    # check if the line function is closed (up to an inverse lattice vector)
-    delta = np.array(line(1)) - np.array(line(0))
-    if not np.isclose(np.round_(delta), delta).all():
-        raise ValueError('Start and end points of the line differ by {}, which is not an inverse lattice vector.'.format(delta))
+    :param lines:   Lines along which the WCC should be calculated.
+    :type lines:    list
 
-    # check if all controls are valid
-    for ctrl in controls:
-        if not isinstance(ctrl, LineControl):
-            raise ValueError('{} control object is not a LineControl instance.'.format(ctrl.__class__))
+    :param init_results:    Initial results for each of the lines.
+    :type init_results:     list
 
-    # filter controls by type
-    def filter_ctrl(ctrl_type):
-        return [ctrl for ctrl in controls if isinstance(ctrl, ctrl_type)]
+    The other parameters are the same as for :meth:`.run`.
+    """
+    if retention is None:
+        retention = _EigenstateRetention()
+    if init_results is None:
+        init_results = [None] * len(lines)
+
+    runs = [
+        _LineRun(
+            *controls,
+            system=system,
+            line=line,
+            save_file=save_file,
+            init_result=init_result,
+            serializer=serializer,
+            streaming=retention.streaming
+        ) for controls, line, init_result in zip(
+            line_controls, lines, init_results
+        )
+    ]
+
+    results = [None] * len(runs)
+    active = dict(enumerate(runs))
+    while active:
+        # group the lines by number of k-points
+        batches = collections.defaultdict(list)
+        for i, run in list(active.items()):
+            t_values = run.next_t_values()
+            if t_values is None:
+                # The eigenstates of a finished line are released as soon
+                # as possible, instead of waiting for the other lines.
+                run.eig_cache.clear()
+                run.result = results[i] = retention.apply(run.result)
+                del active[i]
+            else:
+                batches[len(t_values)].append(run)
+        for num_steps, batch in batches.items():
+            _update_batch(batch, np.linspace(0., 1., num_steps))
+
+    return results
+
+def _update_batch(runs, t_values):
+    """
+    Computes the data for the given line runs, which are all at the same line parameters ``t_values``, and updates the runs.
+    """
+    if len(runs) == 1 or runs[0].streaming:
+        for run in runs:
+            run.update(run.get_data(t_values))
+        return
+    if runs[0].has_eigenstates:
+        _fill_eig_caches(runs, t_values)
+        data_list = EigenstateLineData.from_eigenstates_batch(
+            [run.get_system_output(t_values) for run in runs]
+        )
+    else:
+        data_list = WccLineData.from_overlaps_batch(
+            [run.get_system_output(t_values) for run in runs]
+        )
+    for run, data in zip(runs, data_list):
+        run.update(data)
 
-    stateful_ctrl = filter_ctrl(StatefulControl)
-    iteration_ctrl = filter_ctrl(IterationControl)
-    data_ctrl = filter_ctrl(DataControl)
-    convergence_ctrl = filter_ctrl(ConvergenceControl)
+def _fill_eig_caches(runs, t_values):
+    """
+    Computes the eigenstates at the given line parameters which are not yet in the cache of the runs, for all runs in a single call to the system.
+    """
+    runs_new_t = []
+    for run in runs:
+        new_t_values = [t for t in t_values if t not in run.eig_cache]
+        if new_t_values:
+            runs_new_t.append((run, new_t_values))
+    if not runs_new_t:
+        return
+    system = runs[0].system
+    kpt_lines = [
+        [np.array(run.line(t)) for t in new_t_values]
+        for run, new_t_values in runs_new_t
+    ]
+    _LOGGER.debug('Computing eigenstates for {} new k-points on {} lines.'.format(sum(len(kpt) for kpt in kpt_lines), len(kpt_lines)))
+    if hasattr(system, 'get_eig_lines'):
+        eig_lines = system.get_eig_lines(kpt_lines)
+    else:
+        eig_lines = [system.get_eig(kpt) for kpt in kpt_lines]
+    for (run, new_t_values), eigs in zip(runs_new_t, eig_lines):
+        run.eig_cache.update(zip(new_t_values, eigs))
 
-    def save():
-        if save_file is not None:
-            _LOGGER.info('Saving line result to file {}'.format(save_file))
-            io.save(result, save_file, serializer=serializer)
+class _LineRun:
+    """
+    Contains the state of the calculation for a single line.
 
-    # initialize stateful and data controls from old result
-    if init_result is not None:
-        for d_ctrl in data_ctrl:
-            # not necessary for StatefulControls
-            if d_ctrl not in stateful_ctrl:
-                d_ctrl.update(init_result.data)
-        for s_ctrl in stateful_ctrl:
-            with contextlib.suppress(KeyError):
-                s_ctrl.state = init_result.ctrl_states[s_ctrl.__class__.__name__]
-        result = LineResult(init_result.data, stateful_ctrl, convergence_ctrl)
-        save()
-
-    # Detect which type of System is active
-    if hasattr(system, 'get_eig'):
-        DataType = EigenstateLineData
-        system_fct = system.get_eig
-    else:
-        DataType = WccLineData.from_overlaps
-        system_fct = system.get_mmn
+    :param controls: Control objects which govern the iteration.
+    :type controls: AbstractControl
+
+    :param streaming:   Determines whether the Wilson loop is computed while iterating over the eigenstates, without storing them.
+    :type streaming:    bool
 
-    def collect_convergence():
-        res = [c_ctrl.converged for c_ctrl in convergence_ctrl]
+    The other parameters are the same as for :meth:`.run`.
+    """
+    def __init__(
+            self,
+            *controls,
+            system,
+            line,
+            save_file=None,
+            init_result=None,
+            serializer='auto',
+            streaming=False
+    ):
+        self.start_time = time.time() # timing the run
+
+        # check if the line function is closed (up to an inverse lattice vector)
+        delta = np.array(line(1)) - np.array(line(0))
+        if not np.isclose(np.round(delta), delta).all():
+            raise ValueError('Start and end points of the line differ by {}, which is not an inverse lattice vector.'.format(delta))
+
+        # check if all controls are valid
+        for ctrl in controls:
+            if not isinstance(ctrl, LineControl):
+                raise ValueError('{} control object is not a LineControl instance.'.format(ctrl.__class__))
+
+        # filter controls by type
+        def filter_ctrl(ctrl_type):
+            return [ctrl for ctrl in controls if isinstance(ctrl, ctrl_type)]
+
+        self.stateful_ctrl = filter_ctrl(StatefulControl)
+        self.iteration_ctrl = filter_ctrl(IterationControl)
+        self.data_ctrl = filter_ctrl(DataControl)
+        self.convergence_ctrl = filter_ctrl(ConvergenceControl)
+
+        self.system = system
+        self.line = line
+        self.save_file = save_file
+        self.serializer = serializer
+        self.has_eigenstates = hasattr(system, 'get_eig')
+        self.streaming = streaming and self.has_eigenstates
+        self.done = False
+        # eigenstates are cached by the line parameter t, s.t. only new
+        # k-points have to be computed when the number of steps increases
+        self.supports_partial_lines = getattr(
+            system, 'supports_partial_lines', False
+        )
+        self.eig_cache = dict()
+
+        # initialize stateful and data controls from old result
+        if init_result is not None:
+            for d_ctrl in self.data_ctrl:
+                # not necessary for StatefulControls
+                if d_ctrl not in self.stateful_ctrl:
+                    d_ctrl.update(init_result.data)
+            for s_ctrl in self.stateful_ctrl:
+                with contextlib.suppress(KeyError):
+                    s_ctrl.state = init_result.ctrl_states[s_ctrl.__class__.__name__]
+            self.result = LineResult(
+                init_result.data, self.stateful_ctrl, self.convergence_ctrl
+            )
+            self.save()
+
+    def save(self):
+        """
+        Saves the current result to the save file, if one is given.
+        """
+        # This is here to avoid circular import with the Surface (is solved in Python 3.5 and higher)
+        from .. import io
+
+        if self.save_file is not None:
+            _LOGGER.info('Saving line result to file {}'.format(self.save_file))
+            io.save(self.result, self.save_file, serializer=self.serializer)
+
+    def collect_convergence(self):
+        res = [c_ctrl.converged for c_ctrl in self.convergence_ctrl]
         LINE_ONLY__LOGGER.info('{} of {} line convergence criteria fulfilled.'.format(sum(res), len(res)))
         return res
 
-    # main loop
-    while not all(collect_convergence()):
+    def next_t_values(self):
+        """
+        Returns the line parameters for the next iteration, or ``None`` if the calculation is finished.
+        """
+        if self.done:
+            return None
+        if all(self.collect_convergence()):
+            self.done = True
+            end_time = time.time()
+            LINE_ONLY__LOGGER.info(end_time - self.start_time, tags=('box', 'skip-before', 'timing'))
+            LINE_ONLY__LOGGER.info(self.result.convergence_report, tags=('convergence_report', 'box'))
+            return None
         run_options = dict()
-        for it_ctrl in iteration_ctrl:
+        for it_ctrl in self.iteration_ctrl:
             try:
                 run_options.update(next(it_ctrl))
                 _LOGGER.info('Calculating line for N = {}'.format(run_options['num_steps']), tags=('offset',))
             except StopIteration:
                 _LOGGER.warn('Iterator stopped before the calculation could converge.')
-                return result
-
-        data = DataType(system_fct(
-            list(np.array(line(k)) for k in np.linspace(0., 1., run_options['num_steps']))
-        ))
-
-        for d_ctrl in data_ctrl:
+                self.done = True
+                return None
+        return np.linspace(0., 1., run_options['num_steps'])
+
+    def get_system_output(self, t_values):
+        """
+        Returns the eigenstates or overlap matrices at the given line parameters.
+        """
+        if self.has_eigenstates:
+            res = _get_eig_cached(
+                system=self.system,
+                line=self.line,
+                t_values=t_values,
+                cache=self.eig_cache
+            )
+            # if the system cannot compute partial lines, the eigenstates
+            # are not re-used s.t. the next iteration passes the whole line
+            if not self.supports_partial_lines:
+                self.eig_cache.clear()
+            return res
+        return self.system.get_mmn([np.array(self.line(t)) for t in t_values])
+
+    def get_data(self, t_values):
+        """
+        Computes the line data at the given line parameters.
+        """
+        if self.streaming:
+            return BoundaryEigenstateLineData.from_eigenstate_iterable(
+                _iter_eig(
+                    self.system, [np.array(self.line(t)) for t in t_values]
+                )
+            )
+        if self.has_eigenstates:
+            return EigenstateLineData(self.get_system_output(t_values))
+        return WccLineData.from_overlaps(self.get_system_output(t_values))
+
+    def update(self, data):
+        """
+        Updates the controls and the result with new line data.
+        """
+        for d_ctrl in self.data_ctrl:
             d_ctrl.update(data)
 
-        result = LineResult(data, stateful_ctrl, convergence_ctrl)
-        save()
+        self.result = LineResult(
+            data, self.stateful_ctrl, self.convergence_ctrl
+        )
+        self.save()
+
+def _get_eig_cached(*, system, line, t_values, cache):
+    """
+    Returns the eigenstates for the given values of the line parameter t. Only the eigenstates which are not yet in the ``cache`` dictionary are computed, and then added to it.
+    """
+    new_t_values = [t for t in t_values if t not in cache]
+    if new_t_values:
+        _LOGGER.debug('Computing eigenstates for {} new k-points.'.format(len(new_t_values)))
+        cache.update(zip(
+            new_t_values,
+            system.get_eig([np.array(line(t)) for t in new_t_values])
+        ))
+    return [cache[t] for t in t_values]
 
-    end_time = time.time()
-    LINE_ONLY__LOGGER.info(end_time - start_time, tags=('box', 'skip-before', 'timing'))
-    LINE_ONLY__LOGGER.info(result.convergence_report, tags=('convergence_report', 'box'))
-    return result
+def _iter_eig(system, kpt):
+    """
+    Returns an iterator over the eigenstates at the given k-points. Systems which are not :class:`.EigenstateSystem` instances can implement ``iter_eig``, otherwise the default implementation is used.
+    """
+    if hasattr(system, 'iter_eig'):
+        return system.iter_eig(kpt)
+    return EigenstateSystem.iter_eig(system, kpt)
@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from fsc.export import export
+
+@export
+def nested_steps(*, start=8, stop=65):
+    """
+    Returns a list of numbers of k-points :math:`N \\rightarrow 2N - 1` which can be used as ``iterator`` in :func:`.line.run` or :func:`.surface.run`. Each k-point string then contains all k-points of the previous one, so that eigenstates can be re-used and only the new midpoints need to be computed.
+
+    :param start:   Number of k-points in the first string.
+    :type start:    int
+
+    :param stop:    Upper limit (inclusive) for the number of k-points.
+    :type stop:     int
+    """
+    if start < 2:
+        raise ValueError('The initial number of k-points must be at least 2.')
+    steps = []
+    num_steps = start
+    while num_steps <= stop:
+        steps.append(num_steps)
+        num_steps = 2 * num_steps - 1
+    return steps
@@ -9,7 +9,7 @@ import decorator
 import numpy as np
 from fsc.export import export
 
-from ._utils import _pol_step
+from ._utils import _pol_step_batch
 
 @decorator.decorator
 def _plot(func, data, *, axis=None, **kwargs):
@@ -35,15 +35,10 @@ def _plot(func, data, *, axis=None, **kwargs):
 
 def _plot_gaps(surface_result, *, axis, gaps, gap_settings):
     if gaps:
+        t_values = surface_result.get_array('t')
+        gap_pos = surface_result.get_array('gap_pos') % 1
         for offset in [-1, 0, 1]:
-            axis.plot(
-                surface_result.t,
-                [
-                    gap_pos % 1 + offset
-                    for gap_pos in surface_result.gap_pos
-                ],
-                **gap_settings
-            )
+            axis.plot(t_values, gap_pos + offset, **gap_settings)
 
 @export
 @_plot
@@ -145,10 +140,14 @@ def wcc(
     """
     _plot_gaps(surface_result, axis=axis, gaps=gaps, gap_settings=gap_settings)
 
-    for line in surface_result.lines:
+    wcc_all, offsets = surface_result.get_wcc_array()
+    for t, start, stop in zip(
+            surface_result.get_array('t'), offsets[:-1], offsets[1:]
+    ):
+        line_wcc = wcc_all[start:stop] % 1
         for offset in [-1, 0, 1]:
-            axis.scatter([line.t] * len(line.wcc),
-                         [x % 1 + offset for x in line.wcc],
+            axis.scatter([t] * len(line_wcc),
+                         line_wcc + offset,
                          **wcc_settings)
 
 @export
@@ -173,9 +172,9 @@ def chern(
 
     :returns:       :py:class:`matplotlib.figure.Figure` instance (only for ``axis=None``).
     """
-    t_list = surface_result.t
-    pol = surface_result.pol
-    pol_step = _pol_step(pol)
+    t_list = surface_result.get_array('t')
+    pol = surface_result.get_array('pol')
+    pol_step = _pol_step_batch(pol)
     for offset in [-1, 0, 1]:
         for t, p, p_step in zip(zip(t_list, t_list[1:]), pol, pol_step):
             axis.plot(t, [p + offset, p + p_step + offset], **settings)
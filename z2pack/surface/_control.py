@@ -1,22 +1,23 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import abc
+
+import numpy as np
 from fsc.export import export
 
 from .._control import (
-    DataControl,
+    IncrementalDataControl,
     ConvergenceControl,
     SurfaceControl,
 )
-from .._utils import _get_max_move
+from .._utils import _get_max_move, _get_max_move_batch
 
-@export
-class MoveCheck(DataControl, ConvergenceControl, SurfaceControl):
+class _NeighbourCheck(IncrementalDataControl, ConvergenceControl, SurfaceControl):
     """
-    Performs the check whether the WCC in neighbouring lines have moved too much.
+    Base class for the convergence checks between pairs of neighbouring lines. When a single line is inserted or replaced, only the pairs containing that line are checked again.
     """
-    def __init__(self, *, move_tol):
-        self.move_tol = move_tol
+    def __init__(self):
         self._converged = None
 
     @property
@@ -24,27 +25,99 @@ class MoveCheck(DataControl, ConvergenceControl, SurfaceControl):
         return self._converged
 
     def update(self, data):
-        self._converged = [
-            _get_max_move(l1.wcc, l2.wcc) < self.move_tol * min(l1.gap_size, l2.gap_size)
-            for l1, l2 in zip(data.lines[:-1], data.lines[1:])
-        ]
+        self._converged = self._check_pairs(data, 0, len(data.lines))
+
+    def update_line(self, data, index, *, inserted):
+        num_lines = len(data.lines)
+        num_pairs = num_lines - 1
+        if inserted:
+            num_pairs -= 1
+        if self._converged is None or len(self._converged) != max(num_pairs, 0):
+            self.update(data)
+            return
+        start = max(index - 1, 0)
+        # for an inserted line, the pair it was inserted into is replaced
+        # by the two pairs containing the new line
+        stop = index if inserted else index + 1
+        self._converged = (
+            self._converged[:start] +
+            self._check_pairs(data, start, min(index + 2, num_lines)) +
+            self._converged[stop:]
+        )
+
+    @abc.abstractmethod
+    def _check_pairs(self, data, start, stop):
+        """
+        Returns a list containing the convergence of each pair of neighbouring lines, for the lines ``start`` to ``stop`` (exclusive) of the surface data.
+        """
+
+@export
+class MoveCheck(_NeighbourCheck):
+    """
+    Performs the check whether the WCC in neighbouring lines have moved too much.
+    """
+    def __init__(self, *, move_tol):
+        super().__init__()
+        self.move_tol = move_tol
+
+    def _check_pairs(self, data, start, stop):
+        wcc = _stack_wcc(data, start, stop)
+        if wcc is None:
+            wcc_list = data.wcc[start:stop]
+            max_move = [
+                _get_max_move(wcc_1, wcc_2)
+                for wcc_1, wcc_2 in zip(wcc_list[:-1], wcc_list[1:])
+            ]
+        else:
+            max_move = _get_max_move_batch(wcc[:-1], wcc[1:])
+        gap_size = data.get_array('gap_size')[start:stop]
+        return (
+            np.array(max_move) <
+            self.move_tol * np.minimum(gap_size[:-1], gap_size[1:])
+        ).tolist()
 
 @export
-class GapCheck(DataControl, ConvergenceControl, SurfaceControl):
+class GapCheck(_NeighbourCheck):
     """
     Performs the check whether the largest gap is too close to WCC in neighbouring lines.
     """
     def __init__(self, *, gap_tol):
+        super().__init__()
         self.gap_tol = gap_tol
-        self._converged = None
 
-    @property
-    def converged(self):
-        return self._converged
+    def _check_pairs(self, data, start, stop):
+        gap_pos = data.get_array('gap_pos')[start:stop]
+        gap_size = data.get_array('gap_size')[start:stop]
+        wcc = _stack_wcc(data, start, stop)
+        if wcc is None:
+            wcc_list = data.wcc[start:stop]
+            return [
+                all(abs(w2 - g1) > self.gap_tol * s1 for w2 in wcc_2) and
+                all(abs(w1 - g2) > self.gap_tol * s2 for w1 in wcc_1)
+                for wcc_1, wcc_2, g1, g2, s1, s2 in zip(
+                    wcc_list, wcc_list[1:], gap_pos, gap_pos[1:], gap_size,
+                    gap_size[1:]
+                )
+            ]
+        gap_pos = gap_pos[:, np.newaxis]
+        gap_size = gap_size[:, np.newaxis]
+        return (
+            np.all(
+                np.abs(wcc[1:] - gap_pos[:-1]) > self.gap_tol * gap_size[:-1],
+                axis=-1
+            ) & np.all(
+                np.abs(wcc[:-1] - gap_pos[1:]) > self.gap_tol * gap_size[1:],
+                axis=-1
+            )
+        ).tolist()
 
-    def update(self, data):
-        self._converged = [
-            all(abs(w2 - l1.gap_pos) > self.gap_tol * l1.gap_size for w2 in l2.wcc) and
-            all(abs(w1 - l2.gap_pos) > self.gap_tol * l2.gap_size for w1 in l1.wcc)
-            for l1, l2 in zip(data.lines, data.lines[1:])
-        ]
+def _stack_wcc(data, start, stop):
+    """
+    Returns the WCC of the lines ``start`` to ``stop`` (exclusive) as an array of shape ``(L, m)``, or ``None`` if the lines have a different number of WCC (or fewer than two lines are given), in which case the line pairs are checked one by one.
+    """
+    wcc, offsets = data.get_wcc_array()
+    offsets = offsets[start:stop + 1]
+    num_wcc = np.diff(offsets)
+    if len(num_wcc) < 2 or np.any(num_wcc != num_wcc[0]):
+        return None
+    return wcc[offsets[0]:offsets[-1]].reshape(len(num_wcc), num_wcc[0])
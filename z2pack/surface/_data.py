@@ -1,9 +1,11 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import bisect
+
+import numpy as np
 from fsc.export import export
-from fsc.locker import ConstLocker
-from sortedcontainers import SortedList
+from fsc.locker import ConstLocker, change_lock
 
 @export
 class SurfaceData(metaclass=ConstLocker):
@@ -13,19 +15,41 @@ class SurfaceData(metaclass=ConstLocker):
     The following properties / attributes can be accessed:
 
     * ``t`` : A tuple containing all current line positions.
-    * ``lines`` : A sorted list of objects which have two attributes ``t`` (the position, which is the sorting key) and ``result`` (the line's result).
+    * ``lines`` : A tuple of objects which have two attributes ``t`` (the position, which is the sorting key) and ``result`` (the line's result), sorted by their position.
 
     The attributes of the underlying :class:`.LineResult` instances can be directly accessed from the :class:`.SurfaceData` object. This will create a list of attributes for all lines, in the order of their position.
 
+    The values of ``t``, ``pol``, ``gap_pos``, ``gap_size`` and ``wcc`` for all lines are also kept as NumPy arrays (see :meth:`get_array` and :meth:`get_wcc_array`). These arrays are created on first access, and updated in place when lines are added or updated. The lists of these attributes are created from the arrays, and cached until the next line is added or updated.
+
+    The lines are immutable, and adding a line replaces the ``lines`` tuple instead of modifying it. This means that a :meth:`copy` can share the lines with the original object, and is not affected by lines which are added later.
     """
-    # cannot be pickled if it is a local method (lambda) in __init__
-    # when python3.4 support is dropped, operator.attrgetter can be used
+    _ARRAY_KEYS = ['t', 'pol', 'gap_pos', 'gap_size']
+
+    # used as the key of the SortedList in which the lines were stored in
+    # previous versions, it is needed to unpickle these results
     @staticmethod
     def _sort_key(x):
         return x.t
 
     def __init__(self, lines=()):
-        self.lines = SortedList(lines, key=self._sort_key)
+        self.lines = tuple(sorted(lines, key=self._sort_key))
+        self._t = tuple(line.t for line in self.lines)
+        self._arrays = dict()
+        self._lists = dict()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        # the arrays and lists are re-created from the lines when needed
+        state.pop('_arrays', None)
+        state.pop('_lists', None)
+        return state
+
+    def __setstate__(self, state):
+        state['lines'] = tuple(state['lines'])
+        state['_t'] = tuple(line.t for line in state['lines'])
+        state['_arrays'] = dict()
+        state['_lists'] = dict()
+        self.__dict__.update(state)
 
     def add_line(self, t, result):
         """Adds a line result to the list of lines.
@@ -35,32 +59,208 @@ class SurfaceData(metaclass=ConstLocker):
 
         :param result:  Result of the line calculation.
         :type result:   :class:`.LineResult`
+
+        :returns: The index of the new line in ``lines``.
+        """
+        idx = bisect.bisect_right(self._t, t)
+        line = SurfaceLine(t, result)
+        self._set_lines(
+            self.lines[:idx] + (line, ) + self.lines[idx:],
+            self._t[:idx] + (t, ) + self._t[idx:]
+        )
+        self._update_arrays(line, idx, idx)
+        return idx
+
+    def update_line(self, t, result):
+        """Replaces the result of an existing line.
+
+        :param t:   Position of the line (:math:`t_1`).
+        :type t:    float
+
+        :param result:  New result of the line calculation.
+        :type result:   :class:`.LineResult`
+
+        :returns: The index of the line in ``lines``.
+        """
+        idx = bisect.bisect_left(self._t, t)
+        if idx == len(self.lines) or self.lines[idx].t != t:
+            raise ValueError('No line exists at t = {}.'.format(t))
+        line = SurfaceLine(t, result)
+        self._set_lines(
+            self.lines[:idx] + (line, ) + self.lines[idx + 1:], self._t
+        )
+        self._update_arrays(line, idx, idx + 1)
+        return idx
+
+    def copy(self):
+        """
+        Returns a copy of the surface data, which shares the (immutable) lines with this object. Lines which are added to or updated in either of the two objects do not affect the other one.
+        """
+        res = SurfaceData()
+        # the arrays are not shared, because they are modified in place
+        res._set_lines(self.lines, self._t)  # pylint: disable=protected-access
+        return res
+
+    def _set_lines(self, lines, t_values):
+        with change_lock(self, 'none'):
+            self.lines = lines
+            self._t = t_values
+        self._lists.clear()
+
+    def _update_arrays(self, line, start, stop):
+        """
+        Updates the arrays which were already created, after the lines ``start`` to ``stop`` (exclusive) were replaced by the given line.
+        """
+        for key, array in self._arrays.items():
+            if key == 'wcc':
+                wcc, offsets = array
+                offset_values = offsets.values
+                wcc_start = offset_values[start]
+                num_removed = offset_values[stop] - wcc_start
+                new_wcc = line.wcc
+                wcc.replace(wcc_start, wcc_start + num_removed, new_wcc)
+                offsets.replace(start + 1, stop + 1, [wcc_start + len(new_wcc)])
+                offsets.shift(start + 2, len(new_wcc) - num_removed)
+            else:
+                array.replace(start, stop, [getattr(line, key)])
+
+    def get_array(self, key):
+        """
+        Returns the values of ``key`` for all lines, as a read-only array. The array is a view which is updated in place when lines are added or updated, and is valid only until then. It should be copied if it is needed afterwards.
+
+        :param key: The attribute of the lines, one of ``'t'``, ``'pol'``, ``'gap_pos'`` or ``'gap_size'``.
+        :type key:  str
+        """
+        if key not in self._ARRAY_KEYS:
+            raise ValueError(
+                "Invalid key '{}', must be one of {}.".format(
+                    key, ', '.join(self._ARRAY_KEYS)
+                )
+            )
+        if key not in self._arrays:
+            self._arrays[key] = _ArrayBuffer([
+                getattr(line, key) for line in self.lines
+            ])
+        return self._arrays[key].values
+
+    def get_wcc_array(self):
         """
-        self.lines.add(SurfaceLine(t, result))
+        Returns the WCC of all lines as a tuple ``(wcc, offsets)`` of read-only arrays. The array ``wcc`` contains the WCC of all lines one after the other, and the WCC of line ``i`` are ``wcc[offsets[i]:offsets[i + 1]]``. As for :meth:`get_array`, the arrays are valid only until lines are added or updated.
+        """
+        if 'wcc' not in self._arrays:
+            wcc_list = [line.wcc for line in self.lines]
+            offsets = np.zeros(len(wcc_list) + 1, dtype=int)
+            offsets[1:] = np.cumsum([len(wcc) for wcc in wcc_list])
+            self._arrays['wcc'] = (
+                _ArrayBuffer([w for wcc in wcc_list for w in wcc]),
+                _ArrayBuffer(offsets, dtype=int)
+            )
+        wcc, offsets = self._arrays['wcc']
+        return wcc.values, offsets.values
 
     def __getattr__(self, key):
-        if key != 'lines':
-            return [getattr(line, key) for line in self.lines]
-        raise AttributeError
+        if key in ['lines', '_arrays', '_lists']:
+            raise AttributeError
+        if key not in self._lists:
+            if key in ['pol', 'gap_pos', 'gap_size']:
+                value = self.get_array(key).tolist()
+            elif key == 'wcc':
+                wcc, offsets = self.get_wcc_array()
+                value = [
+                    wcc[start:stop].tolist()
+                    for start, stop in zip(offsets[:-1], offsets[1:])
+                ]
+            else:
+                return [getattr(line, key) for line in self.lines]
+            self._lists[key] = value
+        return self._lists[key]
 
     @property
     def t(self):
-        return tuple(line.t for line in self.lines)
+        return self._t
 
     def nearest_neighbour_dist(self, t):
         """
         Returns the distance between :math:`t` and the nearest existing line.
         """
-        if len(self.t) == 0:
+        if not self._t:
             return 1
-        return min(abs(t - tval) for tval in self.t)
+        # since the lines are sorted, the nearest line is one of the two
+        # neighbours of t
+        idx = bisect.bisect_left(self._t, t)
+        return min(abs(t - tval) for tval in self._t[max(idx - 1, 0):idx + 1])
+
+class _ArrayBuffer:
+    """
+    One-dimensional array with spare capacity at the end, s.t. values can be inserted without re-allocating the array each time. When the capacity is exceeded, it is doubled.
+
+    :param values: Initial values of the array.
+    :type values: list
+
+    :param dtype: Data type of the array.
+    """
+    def __init__(self, values, dtype=float):
+        values = np.asarray(values, dtype=dtype)
+        self._size = len(values)
+        self._buffer = np.empty(max(2 * self._size, 8), dtype=dtype)
+        self._buffer[:self._size] = values
+
+    @property
+    def values(self):
+        """
+        Read-only view of the current values.
+        """
+        res = self._buffer[:self._size]
+        res.flags.writeable = False
+        return res
+
+    def replace(self, start, stop, values):
+        """
+        Replaces the values from ``start`` to ``stop`` (exclusive) by the given values. The values after ``stop`` are moved accordingly.
+        """
+        values = np.asarray(values, dtype=self._buffer.dtype)
+        new_size = self._size + len(values) - (stop - start)
+        tail = self._buffer[stop:self._size]
+        if new_size > len(self._buffer):
+            buffer = np.empty(
+                max(2 * len(self._buffer), new_size),
+                dtype=self._buffer.dtype
+            )
+            buffer[:start] = self._buffer[:start]
+        else:
+            buffer = self._buffer
+        # NumPy handles the overlap if the tail is moved within the buffer
+        buffer[start + len(values):new_size] = tail
+        buffer[start:start + len(values)] = values
+        self._buffer = buffer
+        self._size = new_size
+
+    def shift(self, start, delta):
+        """
+        Adds ``delta`` to all values starting from index ``start``.
+        """
+        self._buffer[start:self._size] += delta
 
 class SurfaceLine:
+    """
+    Immutable container for the position ``t`` and ``result`` of a line in the surface.
+    """
     __slots__ = ['t', 'result']
 
     def __init__(self, t, result):
-        self.t = t
-        self.result = result
+        super().__setattr__('t', t)
+        super().__setattr__('result', result)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("'SurfaceLine' object is immutable.")
+
+    def __reduce__(self):
+        return (SurfaceLine, (self.t, self.result))
+
+    def __setstate__(self, state):
+        # needed for results pickled with previous versions
+        for key, value in state[1].items():
+            super().__setattr__(key, value)
 
     def __getattr__(self, key):
         if key not in ['t', 'result']:
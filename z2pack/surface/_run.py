@@ -5,6 +5,7 @@ import os
 import copy
 import time
 import logging
+import functools
 import contextlib
 
 import numpy as np
@@ -19,6 +20,7 @@ from .._control import (
     LineControl,
     SurfaceControl,
     DataControl,
+    IncrementalDataControl,
     StatefulControl,
     ConvergenceControl
 )
@@ -28,6 +30,7 @@ from .._logging_tools import TagAdapter, TagFilter, FilterManager
 _LOGGER = TagAdapter(_LOGGER, default_tags=('surface',))
 
 from ..line import _run as _line_run
+from ..line._retention import _EigenstateRetention
 from ..line._control import StepCounter, PosCheck, ForceFirstUpdate
 
 @export
@@ -45,7 +48,11 @@ def run_surface(
         save_file=None,
         load=False,
         load_quiet=True,
-        serializer='auto'
+        serializer='auto',
+        executor=None,
+        eigenstate_retention='all',
+        eigenstate_max_bytes=0,
+        save_interval=0.
 ):
     r"""
     Calculates the Wannier charge centers for a given system and surface.
@@ -77,7 +84,7 @@ def run_surface(
 
     :param iterator:    Generator for the number of points in a k-point string. The iterator should also take care of the maximum number of iterations. It is needed even when ``pos_tol=None``, to provide a starting value.
 
-    :param save_file:   Path to a file where the result should be stored.
+    :param save_file:   Path to a file where the result should be stored. If the file ending is ``.journal`` (or ``serializer=z2pack.io.journal``), the result is saved as an append-only journal: only the new or updated lines are written to the file, instead of re-writing the whole result. Journals can be loaded with :func:`.io.load`, and compacted with :func:`.io.compact_journal`.
     :type save_file:    str
 
     :param init_result: Initial result which is loaded at the start of the calculation.
@@ -89,9 +96,21 @@ def run_surface(
     :param load_quiet:  Determines whether errors / inexistent files are ignored when loading from ``save_file``
     :type load_quiet:   bool
 
-    :param serializer:  Serializer which is used to save the result to file. Valid options are :py:mod:`msgpack`, :py:mod:`json` and :py:mod:`pickle`. By default (``serializer='auto'``), the serializer is inferred from the file ending. If this fails, :py:mod:`json` is used.
+    :param serializer:  Serializer which is used to save the result to file. Valid options are :py:mod:`msgpack`, :py:mod:`json`, :py:mod:`pickle` and :py:mod:`z2pack.io.npz` (which stores the eigenstates and WCC as NumPy arrays). By default (``serializer='auto'``), the serializer is inferred from the file ending. If this fails, :py:mod:`json` is used.
     :type serializer:   module
 
+    :param executor:    Executor which is used to compute the lines of each batch (the initial lines, and the lines added in each iteration) concurrently. The results are still added to the surface in order of their position. A :class:`concurrent.futures.ProcessPoolExecutor` is recommended for making use of many cores, but requires that the ``system`` and ``surface`` can be pickled (i.e., they cannot be lambda functions). By default, the lines are computed one after the other.
+    :type executor:     :class:`concurrent.futures.Executor`
+
+    :param eigenstate_retention:    Determines how the eigenstates are kept in the result once the line calculation is finished. With ``'all'``, all eigenstates are kept in memory. With ``'boundary'``, only the eigenstates at the start and end of the line are kept, together with the Wilson loop. With ``'memmap'``, the eigenstates are moved to a temporary memory-mapped file once their size exceeds ``eigenstate_max_bytes``. With ``'streaming'``, the eigenstates are not stored even during the calculation: they are computed one k-point at a time (see :meth:`.EigenstateSystem.iter_eig`), and the Wilson loop is accumulated on the fly. The result is the same as for ``'boundary'``, but the eigenstates are not re-used when the number of k-points is increased. The properties derived from the eigenstates (``wilson``, ``wcc``, ``wilson_eigenstates``) can be used for all policies. This has no effect for systems which provide only overlap matrices.
+    :type eigenstate_retention:     str
+
+    :param eigenstate_max_bytes:    Size (in bytes) of the eigenstates which are kept in memory with the ``'memmap'`` retention policy, summed over all lines of the surface.
+    :type eigenstate_max_bytes:     int
+
+    :param save_interval:   Minimum time (in seconds) between two consecutive saves of the result to ``save_file``. The result is saved in a background thread, and intermediate results which are produced while the previous one is being saved (or within the interval) are skipped. The final result is always saved. This has no effect when the result is saved as a journal.
+    :type save_interval:    float
+
     :returns:   :class:`SurfaceResult` instance.
 
     Example usage:
@@ -133,6 +152,12 @@ def run_surface(
             if not load_quiet:
                 raise e
 
+    if save_interval < 0:
+        raise ValueError(
+            "Invalid value '{}' for 'save_interval', must be non-negative.".
+            format(save_interval)
+        )
+
     if save_file is not None:
         dirname = os.path.dirname(os.path.abspath(save_file))
         if not os.path.isdir(dirname):
@@ -146,7 +171,12 @@ def run_surface(
         min_neighbour_dist=min_neighbour_dist,
         save_file=save_file,
         init_result=init_result,
-        serializer=serializer
+        serializer=serializer,
+        executor=executor,
+        retention=_EigenstateRetention(
+            eigenstate_retention, max_bytes=eigenstate_max_bytes
+        ),
+        save_interval=save_interval
     )
 
 # filter out LogRecords tagged as 'line_only' in the line.
@@ -159,7 +189,10 @@ def _run_surface_impl(
         min_neighbour_dist,
         save_file=None,
         init_result=None,
-        serializer='auto'
+        serializer='auto',
+        executor=None,
+        retention=None,
+        save_interval=0.
 ):
     r"""Implementation of the surface's run.
 
@@ -181,58 +214,105 @@ def _run_surface_impl(
     data_ctrl = filter_ctrl(DataControl)
     convergence_ctrl = filter_ctrl(ConvergenceControl)
 
+    if retention is None:
+        retention = _EigenstateRetention()
+
     # HELPER FUNCTIONS
 
-    def get_line(t, init_line_result=None):
+    def get_lines(t_values, init_line_results=None):
         """
-        Runs a line calculation and returns its result.
+        Runs the line calculations for the given positions, and returns an iterator over their results in the same order. Without executor, the lines are calculated together, s.t. the line data of all lines is computed in a single batch in each iteration, and the eigenstate retention policy is applied to each line as soon as it is finished. With an executor, the policy is applied here, s.t. the size limit applies to all lines, also when they are calculated in different processes.
         """
-        return _line_run._run_line_impl(
-            *copy.deepcopy(line_ctrl),
-            system=system,
-            line=lambda ky: surface(t, ky),
-            init_result=init_line_result
+        if init_line_results is None:
+            init_line_results = [None] * len(t_values)
+        if executor is None:
+            return iter(
+                _line_run._run_lines_impl(
+                    [copy.deepcopy(line_ctrl) for _ in t_values],
+                    system=system,
+                    lines=[functools.partial(surface, t) for t in t_values],
+                    init_results=init_line_results,
+                    retention=retention
+                )
+            )
+        line_results = executor.map(
+            functools.partial(
+                _run_line,
+                line_ctrl=line_ctrl,
+                system=system,
+                surface=surface,
+                streaming=retention.streaming
+            ),
+            t_values,
+            init_line_results
         )
+        return map(retention.apply, line_results)
 
-    # setting up async handler
-    if save_file is not None:
+    # setting up async handler, which is not needed if the result is saved
+    # as a journal
+    if save_file is not None and not _is_journal(save_file, serializer):
         def handler(res):
             _LOGGER.info('Saving surface result to file {} (ASYNC)'.format(save_file))
             io.save(res, save_file, serializer=serializer)
     else:
         handler = None
 
-    with AsyncHandler(handler) as save_thread:
-        def add_line(t):
+    with AsyncHandler(
+        handler, min_interval=save_interval
+    ) as save_thread, _journal_writer(
+        save_file, serializer, init_result
+    ) as journal_writer:
+        def add_lines(t_values):
             """
-            Adds a line to the Surface, if it is within min_neighbour_dist of
-            the given lines.
+            Adds lines to the Surface, if they are not within min_neighbour_dist of the existing lines or of each other. The lines are calculated concurrently, but added in the given order.
             """
-            # find whether the line is allowed still
-            dist = data.nearest_neighbour_dist(t)
-            if dist < min_neighbour_dist:
-                if dist == 0:
-                    _LOGGER.info("Line at t = {} exists already.".format(t))
-                else:
-                    _LOGGER.warn("'min_neighbour_dist' reached: cannot add line at t = {}".format(t))
-                return SurfaceResult(data, stateful_ctrl, convergence_ctrl)
-
-            _LOGGER.info('Adding line at t = {}'.format(t))
-            data.add_line(t, get_line(t))
-
-            return update_result()
+            # find which lines are allowed still
+            dist_list = []
+            t_allowed = []
+            for t in t_values:
+                dist = min(
+                    [data.nearest_neighbour_dist(t)] +
+                    [abs(t - t_other) for t_other in t_allowed]
+                )
+                dist_list.append(dist)
+                if dist >= min_neighbour_dist:
+                    t_allowed.append(t)
+
+            line_results = get_lines(t_allowed)
+            result = SurfaceResult(data, stateful_ctrl, convergence_ctrl)
+            for t, dist in zip(t_values, dist_list):
+                if dist < min_neighbour_dist:
+                    if dist == 0:
+                        _LOGGER.info("Line at t = {} exists already.".format(t))
+                    else:
+                        _LOGGER.warn("'min_neighbour_dist' reached: cannot add line at t = {}".format(t))
+                    continue
+                _LOGGER.info('Adding line at t = {}'.format(t))
+                line_result = next(line_results)
+                index = data.add_line(t, line_result)
+                result = update_result(t, line_result, index, inserted=True)
+            return result
 
-        def update_result():
+        def update_result(t, line_result, index, *, inserted):
             """
-            Updates all data controls, then creates the result object, saves it to file if necessary and returns the result.
+            Updates all data controls after the line at position t (with the given index) was added or updated, then creates the result object, saves it to file if necessary and returns the result.
             """
 
-            # update data controls
+            # update data controls, only the pairs of lines containing the
+            # new line need to be checked again by incremental controls
             for d_ctrl in data_ctrl:
-                d_ctrl.update(data)
+                if isinstance(d_ctrl, IncrementalDataControl):
+                    d_ctrl.update_line(data, index, inserted=inserted)
+                else:
+                    d_ctrl.update(data)
 
-            result = SurfaceResult(data, stateful_ctrl, convergence_ctrl)
-            save_thread.send(copy.deepcopy(result))
+            # the lines are immutable, s.t. a copy of the data is a stable
+            # snapshot for saving
+            result = SurfaceResult(data.copy(), stateful_ctrl, convergence_ctrl)
+            if journal_writer is not None:
+                journal_writer.add_line(t, line_result, result)
+            else:
+                save_thread.send(result)
 
             return result
 
@@ -250,22 +330,29 @@ def _run_surface_impl(
         # initialize stateful controls from old result
         if init_result is not None:
             _LOGGER.info("Initializing result from 'init_result'.")
-            # make sure old result doesn't change
-            init_result = copy.deepcopy(init_result)
-
             # get states from pre-existing Controls
             for s_ctrl in stateful_ctrl:
                 with contextlib.suppress(KeyError):
-                    s_ctrl.state = init_result.ctrl_states[s_ctrl.__class__.__name__]
+                    s_ctrl.state = copy.deepcopy(
+                        init_result.ctrl_states[s_ctrl.__class__.__name__]
+                    )
 
-            data = init_result.data
+            # the copy shares the lines, but updating them does not change
+            # the old result
+            data = init_result.data.copy()
 
             # re-run lines with existing result as input
             _LOGGER.info('Re-running existing lines.')
-            for line in data.lines:
+            lines = list(data.lines)
+            line_results = get_lines(
+                [line.t for line in lines],
+                [line.result for line in lines]
+            )
+            for line in lines:
                 _LOGGER.info('Re-running line for t = {}'.format(line.t))
-                line.result = get_line(line.t, line.result)
-                update_result()
+                line_result = next(line_results)
+                index = data.update_line(line.t, line_result)
+                update_result(line.t, line_result, index, inserted=False)
 
         else:
             data = SurfaceData()
@@ -273,8 +360,7 @@ def _run_surface_impl(
         # STEP 2 -- PRODUCE REQUIRED STRINGS
         # create lines required by num_lines
         _LOGGER.info("Adding lines required by 'num_lines'.")
-        for t in np.linspace(0, 1, num_lines):
-            result = add_line(t)
+        result = add_lines(np.linspace(0, 1, num_lines))
 
         # STEP 3 -- MAIN LOOP
         N = len(data.lines)
@@ -286,8 +372,7 @@ def _run_surface_impl(
                 for (t1, t2), c in zip(zip(data.t, data.t[1:]), conv)
                 if not c
             ]
-            for t in new_t:
-                result = add_line(t)
+            result = add_lines(new_t)
 
             # check if new lines appeared
             N_new = len(data.lines)
@@ -300,3 +385,43 @@ def _run_surface_impl(
     _LOGGER.info(end_time - start_time, tags=('box', 'skip-before', 'timing'))
     _LOGGER.info(result.convergence_report, tags=('box', 'convergence_report', 'skip'))
     return result
+
+def _run_line(
+        t, init_line_result, *, line_ctrl, system, surface, streaming=False
+):
+    """
+    Runs a line calculation at position t of the surface and returns its result. This is a module-level function s.t. it can be pickled for use with a process pool.
+    """
+    return _line_run._run_line_impl(
+        *copy.deepcopy(line_ctrl),
+        system=system,
+        line=functools.partial(surface, t),
+        init_result=init_line_result,
+        retention=_get_line_retention(streaming)
+    )
+
+def _get_line_retention(streaming):
+    """
+    Returns the eigenstate retention policy which is used within the line calculations. Except for the ``'streaming'`` policy, which changes how the lines are calculated, the policy is applied only to the results of the line calculations.
+    """
+    return _EigenstateRetention('streaming') if streaming else None
+
+def _is_journal(save_file, serializer):
+    """
+    Determines whether the result should be saved as a journal.
+    """
+    # pylint: disable=protected-access
+    return io._save_load._get_own_serializer(save_file, serializer) is io.journal
+
+@contextlib.contextmanager
+def _journal_writer(save_file, serializer, init_result):
+    """
+    Context manager which yields the writer for the journal file, or ``None`` if the result is not saved as a journal.
+    """
+    if save_file is None or not _is_journal(save_file, serializer):
+        yield None
+        return
+    if init_result is None:
+        init_result = SurfaceResult(SurfaceData(), [], [])
+    with io.journal.JournalWriter(save_file, init_result) as writer:
+        yield writer
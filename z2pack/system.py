@@ -1,28 +1,56 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-r"""Z2Pack can easily be extended to work with different models / systems. The base classes defined here provide the interface to Z2Pack. Of the two classes, :class:`EigenstateSystem` is the more general one and should be preferred if possible."""
+r"""Z2Pack can easily be extended to work with different models / systems. The base classes defined here provide the interface to Z2Pack. Of the two classes, :class:`EigenstateSystem` is the more general one and should be preferred if possible. The :class:`CachedEigenstateSystem` wrapper can be used to avoid computing the eigenstates at the same k-point multiple times."""
 
 import abc
+import threading
+import collections
 
+import numpy as np
 from fsc.export import export
 
 @export
 class EigenstateSystem(metaclass=abc.ABCMeta):
     r"""
     Abstract base class for Z2Pack System classes which can provide eigenstates (periodic part :math:`|u_\mathbf{k}\rangle`).
+
+    By default, :meth:`get_eig` is called with all k-points of a closed line, where the first and last k-point are equivalent. Systems which can also compute the eigenstates for an arbitrary subset of k-points set the ``supports_partial_lines`` attribute to ``True``. The eigenstates which were computed in previous iterations of a line calculation are then re-used, and only the new k-points are passed to :meth:`get_eig`.
     """
+    supports_partial_lines = False
 
     @abc.abstractmethod
     def get_eig(self, kpt):
         r"""
         Returns the periodic part of the eigenstates at each of the given k-points. The eigenstates are given as columns in a 2D array.
 
-        :param kpt: The list of k-points for which the eigenstates are to be computed.
+        :param kpt: The list of k-points for which the eigenstates are to be computed. Unless ``supports_partial_lines`` is set, these are the k-points of a closed line.
         :type kpt:  list
         """
         pass
 
+    def get_eig_lines(self, kpt_lines):
+        r"""
+        Returns the periodic part of the eigenstates for several lists of k-points, in the same format as :meth:`get_eig` for each of them. Systems can override this method to compute the eigenstates of all k-points at once. The default implementation calls :meth:`get_eig` for each list of k-points.
+
+        :param kpt_lines:   Lists of k-points for which the eigenstates are to be computed.
+        :type kpt_lines:    list
+        """
+        return [self.get_eig(kpt) for kpt in kpt_lines]
+
+    def iter_eig(self, kpt):
+        r"""
+        Yields the periodic part of the eigenstates at each of the given k-points, which form a closed line. This is used to compute the Wilson loop without storing the eigenstates of all k-points. The default implementation first computes the eigenstates at the start and end of the line together, s.t. they are given in the same gauge, and then calls :meth:`get_eig` for each of the other k-points separately.
+
+        :param kpt: The list of k-points for which the eigenstates are to be computed.
+        :type kpt:  list
+        """
+        first, last = self.get_eig([kpt[0], kpt[-1]])
+        yield first
+        for k in kpt[1:-1]:
+            yield self.get_eig([k])[0]
+        yield last
+
 @export
 class OverlapSystem(metaclass=abc.ABCMeta):
     r"""
@@ -38,3 +66,150 @@ class OverlapSystem(metaclass=abc.ABCMeta):
         :type kpt:  list
         """
         pass
+
+@export
+class CachedEigenstateSystem(EigenstateSystem):
+    r"""
+    Wrapper around an :class:`EigenstateSystem` which stores the eigenstates of each k-point, such that they are computed only once. When the cache exceeds the given size, the least recently used eigenstates are removed.
+
+    :param system: The system for which the eigenstates are cached.
+    :type system: :class:`EigenstateSystem`
+
+    :param pos: Positions of the orbitals w.r.t. the reduced unit cell. K-points which differ by an inverse lattice vector :math:`\mathbf{G}` share the same cache entry, and the eigenstates are transformed with the phase :math:`e^{-i \mathbf{G} \cdot \mathbf{r}}`. This ensures that the eigenstates at the start and end of a closed line are in the same gauge, also when they are not computed in the same call.
+    :type pos: list
+
+    :param max_bytes: Maximum size of the stored eigenstates, in bytes. By default, the size is not limited.
+    :type max_bytes: int
+
+    :param decimals: Number of decimals to which the k-points are rounded when looking up the cache.
+    :type decimals: int
+
+    The number of cache hits and misses can be accessed through the ``hits`` and ``misses`` attributes.
+    """
+
+    def __init__(self, system, *, pos, max_bytes=None, decimals=10):
+        if pos is None:
+            raise ValueError(
+                'The orbital positions must be given, to transform the eigenstates between k-points which differ by an inverse lattice vector.'
+            )
+        self._system = system
+        self._pos = np.array(pos)
+        self._max_bytes = max_bytes
+        self._decimals = decimals
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_eig(self, kpt):
+        __doc__ = super().__doc__  # pylint: disable=redefined-builtin,no-member,unused-variable
+        keys, shifts = zip(*(self._get_key(k) for k in kpt))
+        # the cached entries are copied while holding the lock, because they
+        # can be evicted by another thread while the new eigenstates are
+        # computed
+        found = dict()
+        missing = collections.OrderedDict()
+        with self._lock:
+            for k, key, shift in zip(kpt, keys, shifts):
+                if key in found or key in missing:
+                    self.hits += 1
+                elif key in self._cache:
+                    self.hits += 1
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+                else:
+                    self.misses += 1
+                    missing[key] = (k, shift)
+        if missing and not self.supports_partial_lines:
+            # the system is called with all k-points, because it may rely
+            # on getting a complete line
+            eigs = self._system.get_eig(kpt)
+            with self._lock:
+                for key, shift, eig in zip(keys, shifts, eigs):
+                    if key in missing:
+                        self._add(key, (self._to_array(eig), shift))
+                        del missing[key]
+            return list(eigs)
+        if missing:
+            eigs = self._system.get_eig([k for k, _ in missing.values()])
+            new_eigs = {
+                key: (self._to_array(eig), shift)
+                for (key, (_, shift)), eig in zip(missing.items(), eigs)
+            }
+            found.update(new_eigs)
+            with self._lock:
+                for key, value in new_eigs.items():
+                    self._add(key, value)
+
+        res = []
+        for key, shift in zip(keys, shifts):
+            eig, cached_shift = found[key]
+            res.append(self._apply_phase(eig, shift - cached_shift))
+        return res
+
+    @property
+    def supports_partial_lines(self):
+        """
+        Determines whether :meth:`get_eig` can be called with any subset of k-points, which is the case if the wrapped system supports it. Otherwise, the wrapped system is called with all given k-points if any of them are not cached.
+        """
+        return getattr(self._system, 'supports_partial_lines', False)
+
+    def _get_key(self, k):
+        """
+        Returns the cache key and the inverse lattice vector by which the k-point differs from it.
+        """
+        k = np.array(k, dtype=float)
+        shift = np.floor(np.round(k, self._decimals))
+        # adding 0. converts -0. to 0.
+        return tuple(np.round(k - shift, self._decimals) + 0.), shift
+
+    def _apply_phase(self, eig, shift):
+        """
+        Transforms the eigenstates by the given inverse lattice vector.
+        """
+        if not np.any(shift):
+            return eig
+        return eig * np.exp(-2j * np.pi * np.dot(self._pos, shift))[None, :]
+
+    @staticmethod
+    def _to_array(eig):
+        """
+        Converts eigenstates to a read-only array, to protect the cached value.
+        """
+        eig = np.array(eig)
+        eig.flags.writeable = False
+        return eig
+
+    def _add(self, key, value):
+        """
+        Adds an entry to the cache and removes the least recently used ones if the cache is too large. Must be called while holding the lock.
+        """
+        # another thread may have added the same k-point in the meantime
+        if key in self._cache:
+            self.num_bytes -= self._cache.pop(key)[0].nbytes
+        self._cache[key] = value
+        self.num_bytes += value[0].nbytes
+        if self._max_bytes is None:
+            return
+        while self.num_bytes > self._max_bytes and self._cache:
+            _, (eig, _) = self._cache.popitem(last=False)
+            self.num_bytes -= eig.nbytes
+
+    def clear(self):
+        """
+        Removes all eigenstates from the cache.
+        """
+        with self._lock:
+            self._cache.clear()
+            self.num_bytes = 0
+
+    # the lock cannot be pickled, it is re-created instead
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()